@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ltv.cohorts import compute_q1, compute_q2, product_recap_fixed, weighted_arpu  # noqa: E402
+from ltv.index import ProductIndex  # noqa: E402
+from ltv.ingest import COLUMNS, clean_orders, encode_orders, read_raw  # noqa: E402
+from ltv.projection import bootstrap_projection  # noqa: E402
+from ltv.timing import StageTimer, profiling  # noqa: E402
+
+PRODUCTS = ["Blush", "Concealer", "Eyeliner", "Eyeshadow", "Foundation", "Lipstick", "Mascara", "Powder"]
+START = np.datetime64("2021-01-01T00:00:00", "s")
+END = np.datetime64("2024-09-30T23:59:59", "s")
+ORDERS_PER_CUSTOMER = 3.3
+HEX = np.array([f"{i:02x}" for i in range(256)], dtype="S2")
+
+
+def uuids(rng, n):
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    s = pd.Series(np.ascontiguousarray(HEX[raw]).view("S32").ravel().astype(str))
+    return (s.str[:8] + "-" + s.str[8:12] + "-" + s.str[12:16] + "-" + s.str[16:20] + "-" + s.str[20:]).to_numpy()
+
+
+def synthetic_chunk(rng, ids, acquired, rows):
+    # Premier achat à la date d'acquisition, réachats à délai exponentiel (~6 mois).
+    customer = rng.integers(0, len(ids), size=rows)
+    delay = rng.exponential(180 * 86400, size=rows).astype(np.int64)
+    delay[rng.random(rows) < 1 / ORDERS_PER_CUSTOMER] = 0
+    delay %= END.astype(np.int64) - acquired[customer] + 1
+    date = (acquired[customer] + delay).astype("datetime64[s]")
+    cents = rng.integers(2000, 20000, size=rows)
+    return pd.DataFrame({
+        "Customer ID": ids[customer],
+        "Order date": pd.Series(np.datetime_as_string(date)).str.replace("T0", " ", regex=False).str.replace("T", " ", regex=False),
+        "Order value": pd.Series(cents // 100).astype(str) + "," + pd.Series(cents % 100).astype(str).str.zfill(2),
+        "Product contained in the order": np.asarray(PRODUCTS, dtype=object)[rng.integers(0, len(PRODUCTS), size=rows)],
+    })
+
+
+def write_synthetic(path, rows, seed=0, chunksize=1_000_000):
+    rng = np.random.default_rng(seed)
+    n_customers = max(1, int(rows / ORDERS_PER_CUSTOMER))
+    ids = uuids(rng, n_customers)
+    acquired = rng.integers(START.astype(np.int64), END.astype(np.int64), size=n_customers)
+    tmp = path + ".tmp"
+    for start in range(0, rows, chunksize):
+        chunk = synthetic_chunk(rng, ids, acquired, min(chunksize, rows - start))
+        chunk.to_csv(tmp, mode="w" if start == 0 else "a", header=start == 0, index=False)
+    os.replace(tmp, path)
+    return path
+
+
+def dataset(data_dir, rows, seed=0):
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"birchbox_{rows}_{seed}.csv")
+    if not os.path.exists(path):
+        write_synthetic(path, rows, seed)
+    return path
+
+
+def max_rss_mb():
+    if resource is not None:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in KiB on Linux.
+        return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return getattr(info, "peak_wset", info.rss) / 2**20
+
+
+def run_stages(path, resamples=0, memory=True):
+    timer = StageTimer(memory=memory)
+    start = time.perf_counter()
+    with profiling(timer):
+        df = clean_orders(read_raw(path))
+        orders = encode_orders(df, version=path)
+        del df
+        compute_q1(orders)
+        compute_q2(orders)
+        weighted_arpu(orders)
+        product_recap_fixed(orders)
+        ProductIndex.from_orders(orders).table()
+        if resamples:
+            bootstrap_projection(orders, resamples)
+    return {
+        "rows": len(orders),
+        "file_mb": os.path.getsize(path) / 2**20,
+        "seconds": time.perf_counter() - start,
+        "max_rss_mb": max_rss_mb(),
+        "stages": timer.summary(),
+    }
+
+
+def run_isolated(path, resamples, memory):
+    # Un processus neuf par taille : max_rss_mb ne cumule pas les tailles précédentes.
+    with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(run_stages, path, resamples, memory).result()
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "columns": list(COLUMNS),
+    }
+
+
+def mb(value):
+    return float("nan") if value is None else value
+
+
+def compare(old_path, new_path):
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"{'rows':>10}  {'stage':<24} {'old s':>9} {'new s':>9} {'x':>6} {'old MB':>8} {'new MB':>8}")
+    for size, run in new["runs"].items():
+        before = old["runs"].get(size)
+        if before is None:
+            continue
+        for stage, entry in run["stages"].items():
+            prev = before["stages"].get(stage)
+            if prev is None:
+                continue
+            ratio = prev["seconds"] / entry["seconds"] if entry["seconds"] else float("nan")
+            print(
+                f"{size:>10}  {stage:<24} {prev['seconds']:9.3f} {entry['seconds']:9.3f} {ratio:6.2f}"
+                f" {prev.get('peak_mb', float('nan')):8.1f} {entry.get('peak_mb', float('nan')):8.1f}"
+            )
+        print(f"{size:>10}  {'total':<24} {before['seconds']:9.3f} {run['seconds']:9.3f}"
+              f" {before['seconds'] / run['seconds']:6.2f} {mb(before['max_rss_mb']):8.1f} {mb(run['max_rss_mb']):8.1f}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark par étape du pipeline LTV sur données synthétiques.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000], help="tailles à mesurer (lignes)")
+    parser.add_argument("--data-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"), help="dossier des CSV générés (réutilisés)")
+    parser.add_argument("--out", default="bench_ltv.json", help="fichier JSON de résultats")
+    parser.add_argument("--resamples", type=int, default=0, help="tirages bootstrap à inclure (0 : sans)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="sans tracemalloc (temps plus proches du réel)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare deux fichiers JSON de résultats")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return 0
+    result = {"meta": dict(environment(), resamples=args.resamples, memory=not args.no_memory), "runs": {}}
+    for rows in args.rows:
+        path = dataset(args.data_dir, rows, args.seed)
+        run = run_isolated(path, args.resamples, not args.no_memory)
+        result["runs"][str(rows)] = run
+        print(f"{rows:>10} lignes : {run['seconds']:.2f} s, RSS max {mb(run['max_rss_mb']):.0f} Mo")
+        for stage, entry in run["stages"].items():
+            peak = f"  {entry['peak_mb']:8.1f} Mo" if "peak_mb" in entry else ""
+            print(f"{'':>12}{stage:<24} {entry['seconds']:9.3f} s{peak}")
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+import importlib
+
+_EXPORTS = {
+    "Orders": "ltv.ingest",
+    "load_orders": "ltv.ingest",
+    "CohortEngine": "ltv.cohorts",
+    "ProductCohortCube": "ltv.cohorts",
+    "compute_q1": "ltv.cohorts",
+    "compute_q2": "ltv.cohorts",
+    "weighted_arpu": "ltv.cohorts",
+    "product_recap_fixed": "ltv.cohorts",
+    "ProductIndex": "ltv.index",
+    "product_index": "ltv.index",
+    "select_cum_arpu": "ltv.index",
+    "CohortState": "ltv.incremental",
+    "stream_cohorts": "ltv.streaming",
+    "stream_index": "ltv.streaming",
+    "parallel_index": "ltv.parallel",
+    "project_ltv": "ltv.projection",
+    "project_batch": "ltv.projection",
+    "project_cohorts": "ltv.projection",
+    "project_products": "ltv.projection",
+    "bootstrap_projection": "ltv.projection",
+    "ltv_summary": "ltv.projection",
+    "compute_tables": "ltv.pipeline",
+    "load_or_compute": "ltv.pipeline",
+    "read_tables": "ltv.pipeline",
+    "write_tables": "ltv.pipeline",
+    "append_orders": "ltv.pipeline",
+    "StageTimer": "ltv.timing",
+    "profiling": "ltv.timing",
+    "timed": "ltv.timing",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'ltv' has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
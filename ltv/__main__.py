@@ -0,0 +1,3 @@
+from ltv.cli import main
+
+raise SystemExit(main())
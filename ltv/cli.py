@@ -0,0 +1,54 @@
+import argparse
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m ltv", description="Calcule les tables LTV (Q1 à Q6) sans lancer le dashboard.")
+    parser.add_argument("inputs", nargs="+", help="fichier(s) CSV de commandes")
+    parser.add_argument("-o", "--out", default="ltv_output", help="dossier de sortie (défaut : ltv_output)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="format des tables (parquet requiert pyarrow)")
+    parser.add_argument("--workers", type=int, default=1, help="processus de calcul (défaut : 1)")
+    parser.add_argument("--streaming", action="store_true", help="lecture par blocs, mémoire bornée")
+    parser.add_argument("--chunksize", type=int, default=1_000_000)
+    parser.add_argument("--max-horizon", type=int, default=24, help="horizon des ARPU cumulés par produit")
+    parser.add_argument("--horizons", type=int, nargs="+", default=[1, 3, 6, 12, 24, 36], help="horizons LTV par produit (mois)")
+    parser.add_argument("--projection-horizon", type=int, default=60)
+    parser.add_argument("--resamples", type=int, default=1000, help="tirages bootstrap par client (0 : sans intervalle)")
+    parser.add_argument("--level", type=float, default=0.95, help="niveau des intervalles de confiance")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--append", metavar="STATE", help="ajoute les fichiers à l'état de cohortes STATE (dossier, créé au besoin) au lieu de tout recalculer")
+    parser.add_argument("--profile", action="store_true", help="affiche le temps de chaque étape")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    from ltv.pipeline import run, run_append
+    from ltv.timing import StageTimer, profiling
+
+    for path in args.inputs:
+        timer = StageTimer()
+        with profiling(timer if args.profile else None):
+            if args.append:
+                out_dir, tables = run_append(
+                    args.append, path, out_root=args.out, fmt=args.format, projection_horizon=args.projection_horizon,
+                )
+            else:
+                out_dir, tables = run(
+                    path,
+                    out_root=args.out,
+                    fmt=args.format,
+                    max_horizon=args.max_horizon,
+                    horizons=args.horizons,
+                    projection_horizon=args.projection_horizon,
+                    workers=args.workers,
+                    streaming=args.streaming,
+                    chunksize=args.chunksize,
+                    resamples=args.resamples,
+                    level=args.level,
+                    seed=args.seed,
+                )
+        print(f"{path} -> {out_dir} ({len(tables)} tables)")
+        if args.profile:
+            for stage, entry in timer.summary().items():
+                print(f"  {stage:<24} {entry['seconds']:9.3f} s  x{entry['calls']}")
+    return 0
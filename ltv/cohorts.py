@@ -0,0 +1,249 @@
+import numpy as np
+import pandas as pd
+
+from ltv.ingest import Orders
+from ltv.timing import traced
+
+
+def month_index(values):
+    return np.asarray(values).astype("datetime64[M]").astype(np.int64)
+
+
+def order_months(dfx):
+    # Cleaned CSV frames only carry order_date; frames built by hand may
+    # already have an order_month column.
+    column = dfx["order_month"] if "order_month" in dfx else dfx["order_date"]
+    return month_index(column.to_numpy())
+
+
+def month_values(index):
+    return np.asarray(index, dtype=np.int64).astype("datetime64[M]").astype("datetime64[s]")
+
+
+def customer_codes(values):
+    # Raw ids (UUID strings or arbitrary integers) are always re-coded densely;
+    # only Orders.customer_id, already factorized by encode_orders, skips this.
+    return pd.factorize(np.asarray(values))[0].astype(np.int64)
+
+
+def first_months(customer, order_month, n_customers=None):
+    n_customers = int(customer.max()) + 1 if n_customers is None else n_customers
+    first = np.full(n_customers, np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(first, customer, order_month)
+    return first
+
+
+def bin_cohorts(group, first, order_month, order_value, n_groups):
+    first_month = int(order_month.min())
+    cohort = first - first_month
+    offset = order_month - first
+    n_cohorts = int(cohort.max()) + 1
+    horizon = int(offset.max()) + 1
+    cell = (group * n_cohorts + cohort) * horizon + offset
+    shape = (n_groups, n_cohorts, horizon)
+    revenue = np.bincount(cell, weights=order_value, minlength=np.prod(shape)).reshape(shape)
+    orders = np.bincount(cell, minlength=np.prod(shape)).reshape(shape)
+    return first_month, revenue, orders
+
+
+class CohortEngine:
+    def __init__(self, first_month, revenue, orders, sizes):
+        self.first_month = first_month
+        self.revenue = revenue
+        self.orders = orders
+        self.sizes = sizes
+
+    @classmethod
+    @traced("cohort_engine")
+    def build(cls, customer, order_month, order_value, first=None):
+        customer = np.asarray(customer, dtype=np.int64)
+        order_month = np.asarray(order_month, dtype=np.int64)
+        order_value = np.asarray(order_value, dtype=np.float64)
+        if len(customer) == 0:
+            return cls(0, np.zeros((0, 0)), np.zeros((0, 0), dtype=np.int64), np.zeros(0, dtype=np.int64))
+        if first is None:
+            first = first_months(customer, order_month)
+        first_month, revenue, orders = bin_cohorts(0, first[customer], order_month, order_value, 1)
+        seen = first[first != np.iinfo(np.int64).max]
+        sizes = np.bincount(seen - first_month, minlength=revenue.shape[1])
+        return cls(first_month, revenue[0], orders[0], sizes)
+
+    @classmethod
+    def from_orders(cls, orders):
+        return cls.build(orders.customer_id, orders.order_month, orders.order_value)
+
+    @classmethod
+    def from_frame(cls, dfx):
+        return cls.build(customer_codes(dfx["customer_id"]), order_months(dfx), dfx["order_value"].to_numpy())
+
+    @property
+    def cohort_months(self):
+        return month_values(self.first_month + np.arange(len(self.sizes)))
+
+    def cum_revenue(self, max_horizon=None):
+        rev = self.revenue
+        if max_horizon is not None:
+            rev = np.zeros((rev.shape[0], max_horizon + 1))
+            width = min(max_horizon + 1, self.revenue.shape[1])
+            rev[:, :width] = self.revenue[:, :width]
+        return np.cumsum(rev, axis=1)
+
+    def cum_arpu(self, max_horizon=None):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.cum_revenue(max_horizon) / self.sizes[:, None]
+
+    def weighted_arpu(self):
+        present = self.orders > 0
+        w = np.where(present, self.cum_arpu() * self.sizes[:, None], 0.0).sum(axis=0)
+        denom = np.where(present, self.sizes[:, None], 0).sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(denom > 0, w / denom, np.nan)
+
+    def _cells(self, values):
+        cohort, months_since = np.nonzero(self.orders)
+        return pd.DataFrame({
+            "cohort_month": self.cohort_months[cohort],
+            "months_since": months_since.astype(np.int32),
+            **{name: v[cohort, months_since] for name, v in values.items()},
+        })
+
+    def cohort_revenue_frame(self):
+        return self._cells({"order_value": self.revenue})
+
+    def cohort_size_frame(self):
+        keep = self.sizes > 0
+        index = pd.Index(self.cohort_months[keep], name="cohort_month")
+        return pd.DataFrame({"cohort_size": self.sizes[keep]}, index=index)
+
+    def cohort_monthly_frame(self):
+        sizes = np.broadcast_to(self.sizes[:, None], self.revenue.shape)
+        return self._cells({
+            "order_value": self.revenue,
+            "cohort_size": sizes,
+            "cum_revenue": self.cum_revenue(),
+            "cum_arpu": self.cum_arpu(),
+        })
+
+    def weighted_frame(self):
+        w = self.weighted_arpu()
+        t = np.flatnonzero(~np.isnan(w))
+        return pd.DataFrame({"months_since": t.astype(np.int32), "weighted_cum_arpu": w[t]})
+
+
+class ProductCohortCube:
+    def __init__(self, products, first_month, revenue, orders, sizes):
+        self.products = products
+        self.first_month = first_month
+        self.revenue = revenue
+        self.orders = orders
+        self.sizes = sizes
+
+    @classmethod
+    @traced("product_cube")
+    def build(cls, customer, product, order_month, order_value, products):
+        customer = np.asarray(customer, dtype=np.int64)
+        product = np.asarray(product, dtype=np.int64)
+        order_month = np.asarray(order_month, dtype=np.int64)
+        order_value = np.asarray(order_value, dtype=np.float64)
+        n_products = len(products)
+        if len(customer) == 0:
+            empty = np.zeros((n_products, 0, 0))
+            return cls(products, 0, empty, empty.astype(np.int64), np.zeros((n_products, 0), dtype=np.int64))
+        pair, pairs = pd.factorize(product * (int(customer.max()) + 1) + customer)
+        first = np.full(len(pairs), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(first, pair, order_month)
+        first_month, revenue, orders = bin_cohorts(product, first[pair], order_month, order_value, n_products)
+        n_cohorts = revenue.shape[1]
+        pair_product = pairs // (int(customer.max()) + 1)
+        cell = pair_product * n_cohorts + (first - first_month)
+        sizes = np.bincount(cell, minlength=n_products * n_cohorts).reshape(n_products, n_cohorts)
+        return cls(products, first_month, revenue, orders, sizes)
+
+    @classmethod
+    def from_orders(cls, orders):
+        return cls.build(orders.customer_id, orders.product, orders.order_month, orders.order_value, orders.products.tolist())
+
+    @classmethod
+    def from_frame(cls, dfx):
+        product, products = pd.factorize(dfx["product"].astype(object), sort=True)
+        return cls.build(
+            customer_codes(dfx["customer_id"]),
+            product,
+            order_months(dfx),
+            dfx["order_value"].to_numpy(),
+            products.tolist(),
+        )
+
+    @property
+    def cohort_months(self):
+        return month_values(self.first_month + np.arange(self.sizes.shape[1]))
+
+    def cum_revenue(self, max_horizon):
+        rev = np.zeros(self.revenue.shape[:2] + (max_horizon + 1,))
+        width = min(max_horizon + 1, self.revenue.shape[2])
+        rev[:, :, :width] = self.revenue[:, :, :width]
+        return np.cumsum(rev, axis=2)
+
+    def cum_arpu(self, max_horizon):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self.cum_revenue(max_horizon) / self.sizes[:, :, None]
+
+    def weighted_arpu(self, max_horizon):
+        n = self.sizes[:, :, None]
+        w = np.where(n > 0, self.cum_arpu(max_horizon) * n, 0.0).sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return w / n.sum(axis=1)
+
+    def ltv(self, horizons=(1, 3, 6, 12, 24, 36)):
+        horizons = list(horizons)
+        w = self.weighted_arpu(max(horizons))
+        keep = self.sizes.sum(axis=1) > 0
+        out = pd.DataFrame(w[keep][:, horizons], columns=[f"LTV_{h}m" for h in horizons])
+        out.insert(0, "product", np.asarray(self.products, dtype=object)[keep])
+        return out
+
+
+def cohort_engine(data):
+    if isinstance(data, CohortEngine):
+        return data
+    if isinstance(data, Orders):
+        return CohortEngine.from_orders(data)
+    return CohortEngine.from_frame(data)
+
+
+@traced("compute_q1")
+def compute_q1(dfx):
+    engine = cohort_engine(dfx)
+    return engine.cohort_revenue_frame(), engine.cohort_size_frame()
+
+
+@traced("compute_q2")
+def compute_q2(dfx):
+    return cohort_engine(dfx).cohort_monthly_frame()
+
+
+@traced("weighted_arpu")
+def weighted_arpu(dfx):
+    if isinstance(dfx, pd.DataFrame) and "cum_arpu" in dfx:
+        t = dfx["months_since"]
+        w = (dfx["cum_arpu"] * dfx["cohort_size"]).groupby(t).sum()
+        denom = dfx["cohort_size"].groupby(t).sum()
+        out = (w / denom)[denom > 0]
+        return pd.DataFrame({"months_since": out.index.to_numpy(), "weighted_cum_arpu": out.to_numpy()})
+    return cohort_engine(dfx).weighted_frame()
+
+
+def product_cube(data):
+    if isinstance(data, ProductCohortCube):
+        return data
+    if isinstance(data, Orders):
+        return ProductCohortCube.from_orders(data)
+    return ProductCohortCube.from_frame(data)
+
+
+@traced("product_recap_fixed")
+def product_recap_fixed(dfx, horizon_1=1, horizon_24=24):
+    recap = product_cube(dfx).ltv((horizon_1, horizon_24))
+    recap.columns = ["product", "LTV_1m", "LTV_24m"]
+    recap["LTV_24m/1m_ratio"] = recap["LTV_24m"] / recap["LTV_1m"]
+    return recap.sort_values("LTV_24m/1m_ratio", ascending=False)
@@ -0,0 +1,259 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from ltv.cohorts import CohortEngine, compute_q1, compute_q2, order_months
+from ltv.ingest import clean_orders, read_raw
+
+SENTINEL = np.iinfo(np.int64).max
+STATE_FORMAT = 1
+CUSTOMERS = ("ids", "codes")
+HISTORY = ("customer", "month", "value", "count")
+RUN_PREFIXES = ("customers-", "history-", "cohorts-")
+
+
+def sorted_run(key, *columns):
+    order = np.argsort(key, kind="stable")
+    return (key[order],) + tuple(c[order] for c in columns)
+
+
+def push_run(runs, run):
+    # Runs are sorted on their first column. A new run is merged into the previous
+    # one while it is at least half as long, so there are O(log n) runs and each
+    # row is rewritten O(log n) times in total.
+    runs.append((None, run))
+    while len(runs) > 1 and 2 * len(runs[-1][1][0]) >= len(runs[-2][1][0]):
+        (_, b), (_, a) = runs.pop(), runs.pop()
+        runs.append((None, sorted_run(*(np.concatenate([x, y]) for x, y in zip(a, b)))))
+
+
+def run_rows(key, values):
+    # Rows of a sorted key matching each of `values`, with the position of their value.
+    lo = np.searchsorted(key, values, side="left")
+    counts = np.searchsorted(key, values, side="right") - lo
+    rows = np.arange(counts.sum()) + np.repeat(lo - np.cumsum(counts) + counts, counts)
+    return np.repeat(np.arange(len(values)), counts), rows
+
+
+def write_run(path, name, columns, run):
+    os.makedirs(os.path.join(path, name), exist_ok=True)
+    for column, values in zip(columns, run):
+        np.save(os.path.join(path, name, f"{column}.npy"), values, allow_pickle=False)
+
+
+def read_run(path, name, columns):
+    return tuple(np.load(os.path.join(path, name, f"{column}.npy"), mmap_mode="r", allow_pickle=False) for column in columns)
+
+
+class CohortState:
+    def __init__(self):
+        self.n_customers = 0
+        self.origin = 0
+        self.revenue = np.zeros((0, 0))
+        self.orders = np.zeros((0, 0), dtype=np.int64)
+        self.sizes = np.zeros(0, dtype=np.int64)
+        # Customer ids and per (customer, month) order totals are kept as sorted
+        # runs of (name on disk or None, arrays). Looking up a batch's customers is
+        # a binary search per run, and saving only writes the runs not yet on disk,
+        # so an append never reads or rewrites the whole history.
+        self.customer_runs = []
+        self.history = []
+        self.path = None
+        self._next = 0
+
+    @classmethod
+    def from_orders(cls, orders):
+        state = cls()
+        state.n_customers = len(orders.customers)
+        push_run(state.customer_runs, sorted_run(np.asarray(orders.customers, dtype=str), np.arange(state.n_customers)))
+        state.apply_codes(orders.customer_id, orders.order_month, orders.order_value)
+        return state
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, "state.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != STATE_FORMAT:
+            raise ValueError(f"Format d'état de cohortes inconnu : {path}")
+        state = cls()
+        state.n_customers, state.origin, state._next = meta["n_customers"], meta["origin"], meta["next"]
+        with np.load(os.path.join(path, meta["cohorts"]), allow_pickle=False) as data:
+            state.revenue, state.orders, state.sizes = data["revenue"], data["orders"], data["sizes"]
+        state.customer_runs = [(name, read_run(path, name, CUSTOMERS)) for name in meta["customers"]]
+        state.history = [(name, read_run(path, name, HISTORY)) for name in meta["history"]]
+        state.path = os.path.abspath(path)
+        return state
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        # Runs already in this directory are immutable; only new or merged ones are written.
+        same = self.path == os.path.abspath(path)
+        for runs, columns, prefix in ((self.customer_runs, CUSTOMERS, "customers"), (self.history, HISTORY, "history")):
+            for i, (name, run) in enumerate(runs):
+                if name is None or not same:
+                    name = f"{prefix}-{self._next:06d}"
+                    self._next += 1
+                    write_run(path, name, columns, run)
+                    runs[i] = (name, run)
+        cohorts = f"cohorts-{self._next:06d}.npz"
+        self._next += 1
+        np.savez(os.path.join(path, cohorts), revenue=self.revenue, orders=self.orders, sizes=self.sizes)
+        meta = {
+            "format": STATE_FORMAT,
+            "origin": self.origin,
+            "n_customers": self.n_customers,
+            "next": self._next,
+            "cohorts": cohorts,
+            "customers": [name for name, _ in self.customer_runs],
+            "history": [name for name, _ in self.history],
+        }
+        tmp = os.path.join(path, "state.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, "state.json"))
+        # Runs merged away and older cohort matrices are only dropped once the new
+        # state.json points past them.
+        keep = set(meta["customers"]) | set(meta["history"]) | {cohorts}
+        for name in os.listdir(path):
+            if name.startswith(RUN_PREFIXES) and name not in keep:
+                target = os.path.join(path, name)
+                shutil.rmtree(target) if os.path.isdir(target) else os.remove(target)
+        self.path = os.path.abspath(path)
+
+    def engine(self):
+        return CohortEngine(self.origin, self.revenue, self.orders, self.sizes)
+
+    def customer_codes(self, customer_ids):
+        inverse, unique = pd.factorize(np.asarray(customer_ids).astype(str))
+        unique = np.asarray(unique, dtype=str)
+        codes = np.full(len(unique), -1, dtype=np.int64)
+        for _, (ids, part) in self.customer_runs:
+            owner, rows = run_rows(ids, unique)
+            codes[owner] = part[rows]
+        new = np.flatnonzero(codes < 0)
+        if len(new):
+            codes[new] = self.n_customers + np.arange(len(new))
+            self.n_customers += len(new)
+            push_run(self.customer_runs, sorted_run(unique[new], codes[new]))
+        return codes[inverse]
+
+    def append(self, customer_ids, order_month, order_value):
+        self.apply_codes(self.customer_codes(customer_ids), order_month, order_value)
+
+    def append_frame(self, dfx):
+        self.append(dfx["customer_id"].to_numpy(), order_months(dfx), dfx["order_value"].to_numpy())
+
+    def append_csv(self, path):
+        self.append_frame(clean_orders(read_raw(path)))
+
+    def apply_codes(self, codes, order_month, order_value):
+        codes = np.asarray(codes, dtype=np.int64)
+        month = np.asarray(order_month, dtype=np.int64)
+        value = np.asarray(order_value, dtype=np.float64)
+        if len(codes) == 0:
+            return
+        self.n_customers = max(self.n_customers, int(codes.max()) + 1)
+        touched, local = np.unique(codes, return_inverse=True)
+        batch_first = np.full(len(touched), SENTINEL, dtype=np.int64)
+        np.minimum.at(batch_first, local, month)
+        # A customer's current cohort is the earliest month in their history.
+        owner, hist_month, hist_value, hist_count = self._history(touched)
+        old = np.full(len(touched), SENTINEL, dtype=np.int64)
+        np.minimum.at(old, owner, hist_month)
+        new = np.minimum(old, batch_first)
+        joined = old == SENTINEL
+        moved = ~joined & (new < old)
+
+        keep = moved[owner]
+        owner, hist_month, hist_value, hist_count = owner[keep], hist_month[keep], hist_value[keep], hist_count[keep]
+        old_f = old[owner]
+        new_f = new[owner]
+        batch_f = new[local]
+
+        lo = min(int(new.min()), self.origin if len(self.sizes) else SENTINEL)
+        hi = max(int(new.max()), self.origin + len(self.sizes) - 1)
+        horizon = max(self.revenue.shape[1], int((month - batch_f).max()) + 1)
+        if len(owner):
+            horizon = max(horizon, int((hist_month - new_f).max()) + 1)
+        self._resize(lo, hi, horizon)
+
+        if len(owner):
+            self._add(old_f, hist_month, -hist_value, -hist_count)
+            self._add(new_f, hist_month, hist_value, hist_count)
+            self.revenue[self.orders == 0] = 0.0
+        np.add.at(self.sizes, old[moved] - self.origin, -1)
+        np.add.at(self.sizes, new[moved | joined] - self.origin, 1)
+        self._add(batch_f, month, value, 1)
+        self._append_history(codes, month, value)
+
+    def _add(self, first, month, value, count):
+        cell = (first - self.origin, month - first)
+        np.add.at(self.revenue, cell, value)
+        np.add.at(self.orders, cell, count)
+
+    def _history(self, customers):
+        # History rows of the given (sorted) customers, with the position of their
+        # owner in `customers`.
+        parts = []
+        for _, seg in self.history:
+            owner, rows = run_rows(seg[0], customers)
+            parts.append((owner,) + tuple(a[rows] for a in seg[1:]))
+        if not parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=np.int64)
+        return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+    def _append_history(self, codes, month, value):
+        agg = (
+            pd.DataFrame({"customer": codes, "month": month, "value": value})
+            .groupby(["customer", "month"], sort=True)["value"]
+            .agg(["sum", "size"])
+        )
+        push_run(self.history, (
+            agg.index.get_level_values("customer").to_numpy(dtype=np.int64),
+            agg.index.get_level_values("month").to_numpy(dtype=np.int64),
+            agg["sum"].to_numpy(),
+            agg["size"].to_numpy(dtype=np.int64),
+        ))
+
+    def _resize(self, lo, hi, horizon):
+        n_cohorts, width = self.revenue.shape
+        if not n_cohorts:
+            self.origin = lo
+        if (lo, hi - lo + 1, horizon) == (self.origin, n_cohorts, width):
+            return
+        shift = self.origin - lo
+        shape = (hi - lo + 1, horizon)
+        revenue = np.zeros(shape)
+        orders = np.zeros(shape, dtype=np.int64)
+        sizes = np.zeros(shape[0], dtype=np.int64)
+        revenue[shift:shift + n_cohorts, :width] = self.revenue
+        orders[shift:shift + n_cohorts, :width] = self.orders
+        sizes[shift:shift + n_cohorts] = self.sizes
+        self.origin, self.revenue, self.orders, self.sizes = lo, revenue, orders, sizes
+
+
+def frames_match(a, b, rtol=1e-9, atol=1e-6):
+    if list(a.columns) != list(b.columns) or len(a) != len(b) or not a.index.equals(b.index):
+        return False
+    for col in a.columns:
+        x, y = a[col].to_numpy(), b[col].to_numpy()
+        if np.issubdtype(x.dtype, np.floating) or np.issubdtype(y.dtype, np.floating):
+            if not np.allclose(x, y, rtol=rtol, atol=atol, equal_nan=True):
+                return False
+        elif not np.array_equal(x, y):
+            return False
+    return True
+
+
+def check_consistency(state, dfx):
+    engine = state.engine()
+    full_revenue, full_size = compute_q1(dfx)
+    inc_revenue, inc_size = compute_q1(engine)
+    return (
+        frames_match(full_revenue, inc_revenue)
+        and frames_match(full_size, inc_size)
+        and frames_match(compute_q2(dfx), compute_q2(engine))
+    )
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from ltv.cohorts import CohortEngine, ProductCohortCube
+from ltv.timing import traced
+
+ALL = "(Tous)"
+
+
+class ProductIndex:
+    def __init__(self, overall, cube, max_horizon=24):
+        self.overall = overall
+        self.cube = cube
+        self.max_horizon = max_horizon
+
+    @classmethod
+    def from_orders(cls, orders, max_horizon=24):
+        return cls(CohortEngine.from_orders(orders), ProductCohortCube.from_orders(orders), max_horizon)
+
+    @traced("q5_table")
+    def table(self):
+        width = self.max_horizon + 1
+        entries = [(ALL, self.overall.cohort_months, self.overall.sizes, self.overall.cum_revenue(self.max_horizon))]
+        cube_cum = self.cube.cum_revenue(self.max_horizon)
+        entries += [(p, self.cube.cohort_months, self.cube.sizes[i], cube_cum[i]) for i, p in enumerate(self.cube.products)]
+        frames = []
+        for key, months, sizes, cum in entries:
+            keep = np.flatnonzero(sizes > 0)
+            frames.append(pd.DataFrame({
+                "product": key,
+                "cohort_month": np.repeat(months[keep], width),
+                "months_since": np.tile(np.arange(width), len(keep)),
+                "cum_revenue": cum[keep].ravel(),
+                "cohort_size": np.repeat(sizes[keep], width),
+            }))
+        return pd.concat(frames, ignore_index=True)
+
+
+
+def select_cum_arpu(table, products=ALL):
+    if isinstance(products, str):
+        products = [products]
+    products = list(dict.fromkeys(products))
+    if not products or ALL in products:
+        products = [ALL]
+    # Each product keeps its own acquisition month, so a customer who bought
+    # several of the selected products counts once per product.
+    rows = table[table["product"].isin(products)]
+    out = rows.groupby(["cohort_month", "months_since"], as_index=False)[["cum_revenue", "cohort_size"]].sum()
+    out["cum_arpu"] = out["cum_revenue"] / out["cohort_size"]
+    return out[["cohort_month", "months_since", "cum_arpu"]]
+
+
+@traced("product_index")
+def product_index(orders, max_horizon=24, workers=1):
+    if workers == 1:
+        return ProductIndex.from_orders(orders, max_horizon)
+    from ltv.parallel import parallel_index
+    return parallel_index(orders, max_horizon, workers)
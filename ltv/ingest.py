@@ -0,0 +1,175 @@
+import csv
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from ltv.timing import timed, traced
+
+COLUMNS = {
+    "Customer ID": "customer_id",
+    "Order date": "order_date",
+    "Order value": "order_value",
+    "Product contained in the order": "product",
+}
+CACHE_FORMAT = 1
+ARRAYS = ("customer_id", "customers", "product", "products", "order_date", "order_value", "order_month")
+
+
+@dataclass
+class Orders:
+    customer_id: np.ndarray
+    customers: np.ndarray
+    product: np.ndarray
+    products: np.ndarray
+    order_date: np.ndarray
+    order_value: np.ndarray
+    order_month: np.ndarray
+    version: str
+
+    def __len__(self):
+        return len(self.order_value)
+
+
+def sniff_delimiter(path, sample_lines=20):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        sample = "".join(f.readline() for _ in range(sample_lines))
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return ","
+
+
+def normalize_columns(raw):
+    raw.columns = raw.columns.str.strip()
+    return raw.rename(columns=COLUMNS)
+
+
+@traced("csv_parse")
+def read_raw(path, sep=None):
+    sep = sep or sniff_delimiter(path)
+    return normalize_columns(pd.read_csv(path, sep=sep, engine="c", dtype=str, encoding="utf-8-sig"))
+
+
+def iter_raw(path, chunksize=1_000_000, sep=None):
+    sep = sep or sniff_delimiter(path)
+    with pd.read_csv(path, sep=sep, engine="c", dtype=str, encoding="utf-8-sig", chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield normalize_columns(chunk)
+
+
+def clean_orders(raw):
+    with timed("clean_blanks"):
+        df = raw.replace(r"^\s*$", np.nan, regex=True)
+    with timed("clean_order_date"):
+        df["order_date"] = pd.to_datetime(df["order_date"], errors="coerce")
+    with timed("clean_order_value"):
+        df["order_value"] = (
+            df["order_value"]
+            .astype(str)
+            .str.replace("\u202f", "", regex=False)
+            .str.replace(" ", "", regex=False)
+            .str.replace(",", ".", regex=False)
+        )
+        df["order_value"] = pd.to_numeric(df["order_value"], errors="coerce")
+    with timed("clean_product"):
+        df["product"] = df["product"].astype("string").str.strip().replace({"": None}).fillna("(Inconnu)")
+    return df.dropna(subset=["customer_id", "order_date", "order_value"])
+
+
+@traced("encode")
+def encode_orders(df, version=""):
+    customer_codes, customers = pd.factorize(df["customer_id"])
+    product_codes, products = pd.factorize(df["product"].astype(object), sort=True)
+    order_date = df["order_date"].to_numpy(dtype="datetime64[ns]")
+    return Orders(
+        customer_id=customer_codes.astype(np.int32),
+        customers=np.asarray(customers, dtype=str),
+        product=product_codes.astype(np.int16 if len(products) < 2**15 else np.int32),
+        products=np.asarray(products, dtype=str),
+        order_date=order_date,
+        order_value=df["order_value"].to_numpy(dtype=np.float64),
+        order_month=order_date.astype("datetime64[M]").astype(np.int32),
+        version=version,
+    )
+
+
+@traced("file_hash")
+def file_hash(path, chunk_size=1 << 20):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_dir_for(path, root=None):
+    path = os.path.abspath(path)
+    root = root or os.path.join(os.path.dirname(path), ".ltv_cache")
+    key = hashlib.blake2b(path.encode("utf-8"), digest_size=8).hexdigest()
+    return os.path.join(root, key)
+
+
+def read_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_meta(cache_dir, meta):
+    tmp = os.path.join(cache_dir, "meta.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(cache_dir, "meta.json"))
+
+
+@traced("cache_build")
+def build_cache(path, cache_dir, stat, digest):
+    os.makedirs(cache_dir, exist_ok=True)
+    try:
+        os.remove(os.path.join(cache_dir, "meta.json"))
+    except FileNotFoundError:
+        pass
+    orders = encode_orders(clean_orders(read_raw(path)), version=digest)
+    for name in ARRAYS:
+        np.save(os.path.join(cache_dir, f"{name}.npy"), getattr(orders, name), allow_pickle=False)
+    write_meta(cache_dir, {
+        "format": CACHE_FORMAT,
+        "source": os.path.abspath(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "hash": digest,
+        "rows": len(orders),
+    })
+    return orders
+
+
+@traced("cache_load")
+def load_cache(cache_dir, version, mmap=True):
+    mode = "r" if mmap else None
+    arrays = {name: np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode=mode, allow_pickle=False) for name in ARRAYS}
+    return Orders(version=version, **arrays)
+
+
+@traced("load_orders")
+def load_orders(path, cache_root=None, mmap=True):
+    cache_dir = cache_dir_for(path, cache_root)
+    stat = os.stat(path)
+    meta = read_meta(cache_dir)
+    if meta is None or meta.get("format") != CACHE_FORMAT:
+        return build_cache(path, cache_dir, stat, file_hash(path))
+    if (meta["size"], meta["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+        digest = file_hash(path)
+        if digest != meta["hash"]:
+            return build_cache(path, cache_dir, stat, digest)
+        meta.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        write_meta(cache_dir, meta)
+    try:
+        return load_cache(cache_dir, meta["hash"], mmap=mmap)
+    except (OSError, ValueError):
+        return build_cache(path, cache_dir, stat, file_hash(path))
@@ -0,0 +1,128 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from ltv.cohorts import CohortEngine, ProductCohortCube
+from ltv.index import ProductIndex
+from ltv.timing import traced
+
+
+def worker_count(workers=None):
+    return max(1, os.cpu_count() or 1) if workers is None else max(1, int(workers))
+
+
+class SharedArrays:
+    def __init__(self, **arrays):
+        self._blocks = []
+        self.specs = {}
+        for name, arr in arrays.items():
+            arr = np.ascontiguousarray(arr)
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+            self._blocks.append(shm)
+            self.specs[name] = (shm.name, arr.shape, arr.dtype.str)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        for shm in self._blocks:
+            shm.close()
+            shm.unlink()
+
+
+@contextmanager
+def attached(specs, *names):
+    blocks = [shared_memory.SharedMemory(name=specs[n][0]) for n in names]
+    try:
+        yield [np.ndarray(specs[n][1], dtype=specs[n][2], buffer=shm.buf) for n, shm in zip(names, blocks)]
+    finally:
+        for shm in blocks:
+            shm.close()
+
+
+def shard_rows(shard_of_row, n_shards):
+    # Stable radix sort on small integer ids: rows keep their original order
+    # inside a shard, so per-cell sums add up in the same order as the serial path.
+    order = np.argsort(shard_of_row.astype(np.uint16), kind="stable")
+    bounds = np.searchsorted(shard_of_row[order], np.arange(n_shards + 1))
+    return order, bounds
+
+
+def balance(weights, n_shards):
+    shard = np.zeros(len(weights), dtype=np.int64)
+    load = np.zeros(n_shards)
+    for i in np.argsort(-np.asarray(weights), kind="stable"):
+        shard[i] = int(np.argmin(load))
+        load[shard[i]] += weights[i]
+    return shard
+
+
+def product_shard(specs, start, end, shard_products, origin, span):
+    with attached(specs, "rows", "customer", "product", "month", "value") as (rows, customer, product, month, value):
+        rows = rows[start:end]
+        customer = customer[rows].astype(np.int64)
+        local = np.searchsorted(shard_products, product[rows])
+        month = month[rows].astype(np.int64)
+        value = value[rows]
+    n = len(shard_products)
+    if len(rows) == 0:
+        return np.zeros((n, span, span)), np.zeros((n, span, span), dtype=np.int64), np.zeros((n, span), dtype=np.int64)
+    stride = int(customer.max()) + 1
+    pair, pairs = pd.factorize(local * stride + customer)
+    first = np.full(len(pairs), np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(first, pair, month)
+    row_first = first[pair]
+    cell = (local * span + row_first - origin) * span + (month - row_first)
+    revenue = np.bincount(cell, weights=value, minlength=n * span * span).reshape(n, span, span)
+    orders = np.bincount(cell, minlength=n * span * span).reshape(n, span, span)
+    sizes = np.bincount((pairs // stride) * span + first - origin, minlength=n * span).reshape(n, span)
+    return revenue, orders, sizes
+
+
+@traced("parallel_cube")
+def parallel_cube(orders, workers=None, meanwhile=None):
+    workers = worker_count(workers)
+    products = orders.products.tolist()
+    if workers == 1 or len(orders) == 0:
+        return ProductCohortCube.from_orders(orders)
+    product = np.asarray(orders.product)
+    month = np.asarray(orders.order_month)
+    origin = int(month.min())
+    span = int(month.max()) - origin + 1
+    n_shards = min(workers, len(products))
+    product_shards = balance(np.bincount(product, minlength=len(products)), n_shards)
+    order, bounds = shard_rows(product_shards[product], n_shards)
+    members = [np.flatnonzero(product_shards == k) for k in range(n_shards)]
+    with SharedArrays(rows=order, customer=orders.customer_id, product=product, month=month,
+                      value=orders.order_value) as shared, ProcessPoolExecutor(n_shards) as pool:
+        futures = [
+            pool.submit(product_shard, shared.specs, bounds[k], bounds[k + 1], members[k], origin, span)
+            for k in range(n_shards)
+        ]
+        if meanwhile is not None:
+            meanwhile()
+        parts = [f.result() for f in futures]
+    revenue = np.zeros((len(products), span, span))
+    counts = np.zeros((len(products), span, span), dtype=np.int64)
+    sizes = np.zeros((len(products), span), dtype=np.int64)
+    for idx, (rev, cnt, size) in zip(members, parts):
+        revenue[idx], counts[idx], sizes[idx] = rev, cnt, size
+    n_cohorts = int(np.flatnonzero(sizes.any(axis=0))[-1]) + 1
+    horizon = int(np.flatnonzero(counts.any(axis=(0, 1)))[-1]) + 1
+    return ProductCohortCube(
+        products, origin,
+        revenue[:, :n_cohorts, :horizon], counts[:, :n_cohorts, :horizon], sizes[:, :n_cohorts],
+    )
+
+
+def parallel_index(orders, max_horizon=24, workers=None):
+    # The overall engine is one cheap bincount pass; shipping it to the pool cost
+    # more than it saved, so it is built here while the product shards run.
+    overall = []
+    cube = parallel_cube(orders, workers, meanwhile=lambda: overall.append(CohortEngine.from_orders(orders)))
+    return ProductIndex(overall[0] if overall else CohortEngine.from_orders(orders), cube, max_horizon)
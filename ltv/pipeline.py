@@ -0,0 +1,182 @@
+import hashlib
+import inspect
+import json
+import os
+
+import pandas as pd
+
+from ltv.cohorts import compute_q1, compute_q2, product_recap_fixed, weighted_arpu
+from ltv.incremental import CohortState
+from ltv.index import product_index
+from ltv.ingest import load_orders
+from ltv.projection import bootstrap_projection, project_cohorts, project_ltv, project_products
+from ltv.streaming import stream_index
+from ltv.timing import traced
+
+OUTPUT_FORMAT = 2
+TABLES = (
+    "q1_cohort_revenue", "q1_cohort_size", "q2_cohort_monthly", "q3_weighted_arpu", "q3_projection",
+    "q5_cum_arpu", "q6_product_recap", "ltv_by_product", "ltv_projection", "cohort_projection",
+)
+INDEXED = {"q1_cohort_size": ["cohort_month"]}
+# How the tables are computed, not what they contain: left out of the freshness key.
+EXECUTION = ("workers", "streaming", "chunksize")
+BOOTSTRAP = ("resamples", "level", "seed")
+
+
+def compute_tables(path, max_horizon=24, horizons=(1, 3, 6, 12, 24, 36), projection_horizon=60,
+                   workers=1, streaming=False, chunksize=1_000_000, resamples=1000, level=0.95, seed=0):
+    orders = None
+    if streaming:
+        index = stream_index(path, max_horizon=max_horizon, chunksize=chunksize)
+    else:
+        orders = load_orders(path)
+        index = product_index(orders, max_horizon=max_horizon, workers=workers)
+    engine = index.overall
+    # Customer-level resampling needs the order rows, which streaming never holds.
+    if orders is not None and resamples > 0:
+        projection = bootstrap_projection(orders, resamples, horizon=projection_horizon, level=level, seed=seed)
+    else:
+        projection = project_products(index, horizon=projection_horizon)
+    cohort_revenue, cohort_size = compute_q1(engine)
+    weighted = weighted_arpu(engine)
+    horizons = sorted(set(horizons) | {1, 24})
+    return {
+        "q1_cohort_revenue": cohort_revenue,
+        "q1_cohort_size": cohort_size,
+        "q2_cohort_monthly": compute_q2(engine),
+        "q3_weighted_arpu": weighted,
+        "q3_projection": project_ltv(weighted, horizon=projection_horizon),
+        "q5_cum_arpu": index.table(),
+        "q6_product_recap": product_recap_fixed(index.cube, horizon_1=1, horizon_24=24),
+        "ltv_by_product": index.cube.ltv(horizons),
+        "ltv_projection": projection,
+        "cohort_projection": project_cohorts(engine, horizon=projection_horizon),
+    }
+
+
+def output_dir_for(path, root="ltv_output"):
+    # Same scheme as ingest.cache_dir_for: two inputs named orders.csv in
+    # different folders get different output directories.
+    path = os.path.abspath(path)
+    key = hashlib.blake2b(path.encode("utf-8"), digest_size=4).hexdigest()
+    return os.path.join(root, f"{os.path.splitext(os.path.basename(path))[0]}-{key}")
+
+
+def source_meta(path):
+    stat = os.stat(path)
+    return {"source": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+@traced("write_tables")
+def write_tables(tables, out_dir, fmt="csv", meta=None):
+    os.makedirs(out_dir, exist_ok=True)
+    files = {}
+    for name, table in tables.items():
+        table = table.reset_index() if name in INDEXED else table
+        files[name] = f"{name}.{fmt}"
+        target = os.path.join(out_dir, files[name])
+        if fmt == "parquet":
+            table.to_parquet(target, index=False)
+        else:
+            table.to_csv(target, index=False)
+    manifest = dict(meta or {}, format=fmt, tables=files)
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, "manifest.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def table_options(path, **options):
+    bound = inspect.signature(compute_tables).bind(path, **options)
+    bound.apply_defaults()
+    out = {k: v for k, v in bound.arguments.items() if k != "path" and k not in EXECUTION}
+    # Streaming never draws bootstrap bands, whatever resamples says.
+    if bound.arguments["streaming"] or not out["resamples"]:
+        out.update(resamples=0, level=None, seed=None)
+    # Round-trip through JSON so tuples compare equal to the lists read back.
+    return json.loads(json.dumps(out))
+
+
+def is_fresh(manifest, path, **options):
+    if manifest is None or manifest.get("output_format") != OUTPUT_FORMAT:
+        return False
+    if sorted(manifest.get("tables", ())) != sorted(TABLES):
+        return False
+    wanted = table_options(path, **options)
+    stored = dict(manifest.get("options") or {})
+    # Tables with bootstrap bands also answer a request without them.
+    if not wanted["resamples"]:
+        stored.update({k: wanted[k] for k in BOOTSTRAP if k in stored})
+    if stored != wanted:
+        return False
+    stat = os.stat(path)
+    return (manifest.get("size"), manifest.get("mtime_ns")) == (stat.st_size, stat.st_mtime_ns)
+
+
+@traced("read_tables")
+def read_tables(out_dir):
+    manifest = read_manifest(out_dir)
+    tables = {}
+    for name, file in manifest["tables"].items():
+        target = os.path.join(out_dir, file)
+        table = pd.read_parquet(target) if manifest["format"] == "parquet" else pd.read_csv(target)
+        if "cohort_month" in table:
+            table["cohort_month"] = pd.to_datetime(table["cohort_month"]).astype("datetime64[s]")
+        tables[name] = table.set_index(INDEXED[name]) if name in INDEXED else table
+    return tables
+
+
+def run(path, out_root="ltv_output", fmt="csv", **options):
+    out_dir = output_dir_for(path, out_root)
+    tables = compute_tables(path, **options)
+    meta = dict(source_meta(path), output_format=OUTPUT_FORMAT, options=table_options(path, **options))
+    write_tables(tables, out_dir, fmt=fmt, meta=meta)
+    return out_dir, tables
+
+
+def append_orders(state_path, path):
+    state = CohortState.load(state_path) if os.path.exists(state_path) else CohortState()
+    state.append_csv(path)
+    state.save(state_path)
+    return state
+
+
+def state_tables(state, projection_horizon=60):
+    # The incremental state only tracks the overall cohorts (Q1-Q3), not products.
+    engine = state.engine()
+    cohort_revenue, cohort_size = compute_q1(engine)
+    weighted = weighted_arpu(engine)
+    return {
+        "q1_cohort_revenue": cohort_revenue,
+        "q1_cohort_size": cohort_size,
+        "q2_cohort_monthly": compute_q2(engine),
+        "q3_weighted_arpu": weighted,
+        "q3_projection": project_ltv(weighted, horizon=projection_horizon),
+        "cohort_projection": project_cohorts(engine, horizon=projection_horizon),
+    }
+
+
+def run_append(state_path, path, out_root="ltv_output", fmt="csv", projection_horizon=60):
+    state = append_orders(state_path, path)
+    out_dir = output_dir_for(state_path, out_root)
+    tables = state_tables(state, projection_horizon=projection_horizon)
+    write_tables(tables, out_dir, fmt=fmt, meta={"state": os.path.abspath(state_path), "appended": os.path.abspath(path)})
+    return out_dir, tables
+
+
+def load_or_compute(path, out_root="ltv_output", fmt="csv", write=True, **options):
+    out_dir = output_dir_for(path, out_root)
+    if is_fresh(read_manifest(out_dir), path, **options):
+        return read_tables(out_dir)
+    if not write:
+        return compute_tables(path, **options)
+    return run(path, out_root=out_root, fmt=fmt, **options)[1]
+
@@ -0,0 +1,243 @@
+import numpy as np
+import pandas as pd
+
+from ltv.cohorts import first_months
+from ltv.index import ALL
+from ltv.timing import traced
+
+
+def _rows(n, width, budget=4_000_000):
+    step = max(1, budget // max(width, 1))
+    return [slice(i, min(i + step, n)) for i in range(0, n, step)]
+
+
+def isotonic_batch(y, w):
+    # Increasing isotonic fit of every row at once via the min-max formula
+    # fit[i] = min_{k>=i} max_{j<=i} mean(y[j..k]); equivalent to pool adjacent violators.
+    n, t = y.shape
+    out = np.full((n, t), np.nan)
+    j, k = np.meshgrid(np.arange(t), np.arange(t), indexing="ij")
+    upper = k < j
+    for rows in _rows(n, t * t):
+        wy = np.where(w[rows] > 0, y[rows] * w[rows], 0.0)
+        s = np.concatenate([np.zeros((wy.shape[0], 1)), np.cumsum(wy, axis=1)], axis=1)
+        c = np.concatenate([np.zeros((wy.shape[0], 1)), np.cumsum(w[rows], axis=1)], axis=1)
+        num = s[:, None, 1:] - s[:, :-1, None]
+        den = c[:, None, 1:] - c[:, :-1, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.where((den > 0) & ~upper, num / den, -np.inf)
+        lower = np.maximum.accumulate(mean, axis=1)
+        fit = np.where(upper, np.inf, lower).min(axis=2)
+        out[rows] = np.where(w[rows] > 0, fit, np.nan)
+    return out
+
+
+def polynomial_batch(y, w, months, max_degree=2):
+    t = y.shape[1]
+    scale = max(t - 1, 1)
+    x = np.arange(t) / scale
+    design = np.vander(x, max_degree + 1, increasing=True)
+    wy = np.where(w > 0, y * w, 0.0)
+    gram = np.einsum("nt,ta,tb->nab", w, design, design)
+    rhs = wy @ design
+    degree = np.minimum(max_degree, (w > 0).sum(axis=1) - 1)
+    unused = np.arange(max_degree + 1)[None, :] > degree[:, None]
+    gram[unused] = 0.0
+    gram.transpose(0, 2, 1)[unused] = 0.0
+    gram[:, np.arange(max_degree + 1), np.arange(max_degree + 1)] += unused
+    rhs[unused] = 0.0
+    coef = np.linalg.solve(gram, rhs[..., None])[..., 0]
+    return coef @ np.vander(np.asarray(months) / scale, max_degree + 1, increasing=True).T
+
+
+def interpolate_batch(fit, valid, months):
+    n, t = fit.shape
+    months = np.asarray(months)
+    grid = np.minimum(months, t - 1)
+    idx = np.arange(t)
+    prev = np.maximum.accumulate(np.where(valid, idx, -1), axis=1)
+    nxt = np.minimum.accumulate(np.where(valid, idx, t)[:, ::-1], axis=1)[:, ::-1]
+    first = nxt[:, :1]
+    last = prev[:, -1:]
+    p = np.where(prev[:, grid] < 0, first, prev[:, grid])
+    q = np.where(nxt[:, grid] >= t, last, nxt[:, grid])
+    q = np.where(months[None, :] > t - 1, last, q)
+    p = np.where(months[None, :] > t - 1, last, p)
+    ok = last >= 0
+    p, q = np.where(ok, p, 0), np.where(ok, q, 0)
+    fp, fq = np.take_along_axis(fit, p, axis=1), np.take_along_axis(fit, q, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frac = np.where(q > p, (grid[None, :] - p) / (q - p), 0.0)
+    return np.where(ok, fp + frac * (fq - fp), np.nan)
+
+
+def project_batch(curves, horizon=60):
+    curves = np.atleast_2d(np.asarray(curves, dtype=np.float64))
+    valid = ~np.isnan(curves)
+    w = valid.astype(np.float64)
+    months = np.arange(horizon + 1)
+    isotonic = interpolate_batch(isotonic_batch(curves, w), valid, months)
+    polynomial = polynomial_batch(curves, w, months)
+    polynomial[~valid.any(axis=1)] = np.nan
+    return isotonic, polynomial, np.minimum(isotonic, polynomial)
+
+
+@traced("project_ltv")
+def project_ltv(weighted_df, horizon=60):
+    wa = (
+        weighted_df[["months_since", "weighted_cum_arpu"]]
+        .apply(pd.to_numeric, errors="coerce")
+        .dropna()
+        .sort_values("months_since")
+        .drop_duplicates(subset=["months_since"], keep="last")
+    )
+    if wa.empty:
+        raise ValueError("Aucune donnée propre pour la régression (toutes NaN ou non numériques)")
+    t = wa["months_since"].to_numpy(dtype=np.int64)
+    curve = np.full(t.max() + 1, np.nan)
+    curve[t] = wa["weighted_cum_arpu"].to_numpy(dtype=np.float64)
+    isotonic, polynomial, projected = project_batch(curve, horizon)
+    return pd.DataFrame({
+        "months_since": np.arange(horizon + 1),
+        "isotonic": isotonic[0],
+        "polynomial": polynomial[0],
+        "projected_cum_arpu": projected[0],
+    })
+
+
+def weighted_curve(revenue, present, sizes):
+    cum = np.cumsum(revenue, axis=-1)
+    num = np.where(present, cum, 0.0).sum(axis=-2)
+    den = np.where(present, sizes[..., None], 0.0).sum(axis=-2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den > 0, num / den, np.nan)
+
+
+@traced("project_cohorts")
+def project_cohorts(engine, horizon=60):
+    present = engine.orders > 0
+    curves = np.where(present, engine.cum_arpu(), np.nan)
+    keep = np.flatnonzero(engine.sizes > 0)
+    projected = project_batch(curves[keep], horizon)[2]
+    return pd.DataFrame({
+        "cohort_month": np.repeat(engine.cohort_months[keep], horizon + 1),
+        "months_since": np.tile(np.arange(horizon + 1), len(keep)),
+        "projected_cum_arpu": projected.ravel(),
+    })
+
+
+@traced("project_products")
+def project_products(index, horizon=60):
+    overall = weighted_curve(index.overall.revenue, index.overall.orders > 0, index.overall.sizes)[None, :]
+    products = weighted_curve(index.cube.revenue, index.cube.orders > 0, index.cube.sizes)
+    width = max(overall.shape[1], products.shape[1])
+    curves = np.vstack([pad_curves(overall, width), pad_curves(products, width)])
+    return projection_frame([ALL] + list(index.cube.products), project_batch(curves, horizon)[2], horizon)
+
+
+def pad_curves(curves, width):
+    out = np.full((curves.shape[0], width), np.nan)
+    out[:, :curves.shape[1]] = curves
+    return out
+
+
+def projection_frame(keys, projected, horizon, lower=None, upper=None):
+    out = pd.DataFrame({
+        "product": np.repeat(np.asarray(keys, dtype=object), horizon + 1),
+        "months_since": np.tile(np.arange(horizon + 1), len(keys)),
+        "projected_cum_arpu": projected.ravel(),
+    })
+    if lower is not None:
+        out["lower"] = lower.ravel()
+        out["upper"] = upper.ravel()
+    return out
+
+
+class CustomerBootstrap:
+    # Sparse (cell x customer) matrices of revenue and cohort membership for the
+    # overall cohort matrix and the product cube. A block of draws held as an
+    # (n_customers, b) array of customer multiplicities maps to every resampled
+    # revenue cell and cohort size with one sparse-dense product per matrix.
+    def __init__(self, customer, product, order_month, order_value, products):
+        from scipy import sparse
+
+        customer = np.asarray(customer, dtype=np.int64)
+        product = np.asarray(product, dtype=np.int64)
+        month = np.asarray(order_month, dtype=np.int64)
+        value = np.asarray(order_value, dtype=np.float64)
+        self.products = list(products)
+        self.n_customers = int(customer.max()) + 1
+        self.origin = int(month.min())
+        n_cohorts = int(month.max()) - self.origin + 1
+        self.shape = (len(self.products) + 1, n_cohorts, n_cohorts)
+
+        first = first_months(customer, month, self.n_customers)
+        pair, pairs = pd.factorize(product * self.n_customers + customer)
+        pair_first = np.full(len(pairs), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(pair_first, pair, month)
+        pair_product = pairs // self.n_customers
+        pair_customer = pairs % self.n_customers
+
+        cohort = first[customer]
+        overall_cell = (cohort - self.origin) * n_cohorts + (month - cohort)
+        cohort = pair_first[pair]
+        product_cell = ((product + 1) * n_cohorts + cohort - self.origin) * n_cohorts + (month - cohort)
+        cell = np.concatenate([overall_cell, product_cell])
+        # Duplicate (cell, customer) entries are summed by the CSR conversion.
+        self.revenue = sparse.csr_matrix(
+            (np.concatenate([value, value]), (cell, np.concatenate([customer, customer]))),
+            shape=(np.prod(self.shape), self.n_customers),
+        )
+        seen = np.flatnonzero(first != np.iinfo(np.int64).max)
+        size_cell = np.concatenate([first[seen] - self.origin, (pair_product + 1) * n_cohorts + pair_first - self.origin])
+        self.sizes = sparse.csr_matrix(
+            (np.ones(len(size_cell)), (size_cell, np.concatenate([seen, pair_customer]))),
+            shape=(self.shape[0] * n_cohorts, self.n_customers),
+        )
+        self.present = np.bincount(cell, minlength=np.prod(self.shape)).reshape(self.shape) > 0
+
+    @classmethod
+    def from_orders(cls, orders):
+        return cls(orders.customer_id, orders.product, orders.order_month, orders.order_value, orders.products.tolist())
+
+    def curves(self, weights):
+        # weights: (n_customers, n_resamples) multiplicities.
+        weights = np.asarray(weights, dtype=np.float64).reshape(self.n_customers, -1)
+        b = weights.shape[1]
+        revenue = (self.revenue @ weights).T.reshape((b,) + self.shape)
+        sizes = (self.sizes @ weights).T.reshape((b,) + self.shape[:2])
+        return weighted_curve(revenue, self.present, sizes)
+
+    def resample(self, n_resamples=1000, seed=0, budget=20_000_000):
+        rng = np.random.default_rng(seed)
+        # Poisson(1) customer multiplicities drawn through a 16-bit lookup table.
+        cdf = np.cumsum(np.exp(-1.0) / np.cumprod(np.r_[1.0, np.arange(1, 16)]))
+        table = np.searchsorted(cdf, (np.arange(65536) + 0.5) / 65536).astype(np.uint8)
+        step = max(1, budget // max(self.n_customers, np.prod(self.shape)))
+        out = []
+        for start in range(0, n_resamples, step):
+            b = min(step, n_resamples - start)
+            draws = rng.integers(0, 65536, size=(self.n_customers, b), dtype=np.uint16)
+            out.append(self.curves(table[draws]))
+        return np.concatenate(out)
+
+
+@traced("bootstrap_projection")
+def bootstrap_projection(orders, n_resamples=1000, horizon=60, level=0.95, seed=0):
+    boot = CustomerBootstrap.from_orders(orders)
+    keys = [ALL] + boot.products
+    point = boot.curves(np.ones((boot.n_customers, 1)))[0]
+    projected = project_batch(point, horizon)[2]
+    samples = boot.resample(n_resamples, seed=seed)
+    resampled = project_batch(samples.reshape(-1, samples.shape[-1]), horizon)[2].reshape(n_resamples, len(keys), -1)
+    alpha = (1 - level) / 2
+    lower, upper = np.nanquantile(resampled, [alpha, 1 - alpha], axis=0)
+    return projection_frame(keys, projected, horizon, lower, upper)
+
+
+def ltv_summary(projection, months=(48, 60)):
+    rows = projection[projection["months_since"].isin(months)]
+    values = [c for c in ("projected_cum_arpu", "lower", "upper") if c in rows]
+    out = rows.pivot(index="product", columns="months_since", values=values)
+    out.columns = [f"LTV_{m}m" if v == "projected_cum_arpu" else f"LTV_{m}m_{v}" for v, m in out.columns]
+    return out.reindex(projection["product"].unique())
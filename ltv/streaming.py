@@ -0,0 +1,184 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from ltv.cohorts import CohortEngine, ProductCohortCube, order_months
+from ltv.index import ProductIndex
+from ltv.ingest import clean_orders, iter_raw
+from ltv.timing import traced
+
+
+SPILL = {"key": np.uint64, "month": np.int32, "product": np.int32, "value": np.float64}
+
+
+def customer_keys(values):
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+
+def min_by_key(key, month):
+    order = np.argsort(key, kind="stable")
+    key, month = key[order], month[order]
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    return key[starts], np.minimum.reduceat(month, starts) if len(starts) else month
+
+
+class FirstMonths:
+    # Per group, sorted key -> first month arrays. Chunks are reduced to one row
+    # per (group, key) and merged once the pending rows reach a chunk-sized
+    # threshold, so the buffer never outgrows a chunk plus a fraction of the state.
+    def __init__(self, flush_rows=1_000_000):
+        self.flush_rows = flush_rows
+        self.keys = {}
+        self.months = {}
+        self._size = 0
+        self._pending = {}
+        self._pending_rows = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, group, key, month):
+        if not len(key):
+            return
+        group = np.broadcast_to(np.asarray(group, dtype=np.int64), key.shape)
+        order = np.lexsort((key, group))
+        group, key, month = group[order], key[order], month[order]
+        starts = np.flatnonzero(np.r_[True, (group[1:] != group[:-1]) | (key[1:] != key[:-1])])
+        group, key, month = group[starts], key[starts], np.minimum.reduceat(month, starts)
+        bounds = np.r_[np.flatnonzero(np.r_[True, group[1:] != group[:-1]]), len(group)]
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            self._pending.setdefault(int(group[lo]), []).append((key[lo:hi], month[lo:hi]))
+        self._pending_rows += len(key)
+        if self._pending_rows >= max(self.flush_rows, self._size // 8):
+            self.flush()
+
+    def flush(self):
+        for g, parts in self._pending.items():
+            old = [(self.keys[g], self.months[g])] if g in self.keys else []
+            self._size -= len(old[0][0]) if old else 0
+            self.keys[g], self.months[g] = min_by_key(
+                np.concatenate([k for k, _ in old + parts]),
+                np.concatenate([m for _, m in old + parts]),
+            )
+            self._size += len(self.keys[g])
+        self._pending = {}
+        self._pending_rows = 0
+
+    def lookup(self, group, key):
+        out = np.empty(len(key), dtype=np.int64)
+        if np.ndim(group) == 0:
+            out[:] = self.months[int(group)][np.searchsorted(self.keys[int(group)], key)]
+            return out
+        order = np.argsort(group, kind="stable")
+        groups, starts = np.unique(group[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        for g, start, end in zip(groups, starts, ends):
+            rows = order[start:end]
+            out[rows] = self.months[g][np.searchsorted(self.keys[g], key[rows])]
+        return out
+
+
+def iter_orders(path, chunksize=1_000_000):
+    for raw in iter_raw(path, chunksize=chunksize):
+        chunk = clean_orders(raw)
+        if len(chunk):
+            yield chunk
+
+
+def product_codes(values, products):
+    codes, uniques = pd.factorize(values.astype(object))
+    for name in uniques:
+        products.setdefault(name, len(products))
+    return np.array([products[name] for name in uniques], dtype=np.int64)[codes]
+
+
+@traced("stream_first_months")
+def scan_first_months(path, chunksize=1_000_000, spill_dir=None):
+    # Pass 1 parses and cleans the CSV once; with spill_dir, the compact
+    # key/month/product/value columns are appended to raw files for pass 2.
+    customers, pairs, products = FirstMonths(chunksize), FirstMonths(chunksize), {}
+    files = {name: open(os.path.join(spill_dir, f"{name}.bin"), "wb") for name in SPILL} if spill_dir else {}
+    last_month = None
+    try:
+        for chunk in iter_orders(path, chunksize):
+            columns = {
+                "key": customer_keys(chunk["customer_id"]),
+                "month": order_months(chunk),
+                "product": product_codes(chunk["product"], products),
+                "value": chunk["order_value"].to_numpy(dtype=np.float64),
+            }
+            customers.add(0, columns["key"], columns["month"])
+            pairs.add(columns["product"], columns["key"], columns["month"])
+            last_month = int(columns["month"].max()) if last_month is None else max(last_month, int(columns["month"].max()))
+            for name, f in files.items():
+                f.write(columns[name].astype(SPILL[name]).tobytes())
+    finally:
+        for f in files.values():
+            f.close()
+    customers.flush()
+    pairs.flush()
+    return customers, pairs, products, last_month
+
+
+def iter_spilled(spill_dir, chunksize=1_000_000):
+    files = {name: open(os.path.join(spill_dir, f"{name}.bin"), "rb") for name in SPILL}
+    try:
+        while True:
+            chunk = {name: np.fromfile(f, dtype=SPILL[name], count=chunksize) for name, f in files.items()}
+            if not len(chunk["key"]):
+                return
+            yield chunk
+    finally:
+        for f in files.values():
+            f.close()
+
+
+@traced("stream_cohorts")
+def stream_cohorts(path, chunksize=1_000_000):
+    with tempfile.TemporaryDirectory(prefix="ltv_stream_") as spill_dir:
+        customers, pairs, products, last_month = scan_first_months(path, chunksize, spill_dir)
+        if not products:
+            return CohortEngine.build([], [], []), ProductCohortCube.build([], [], [], [], [])
+        origin = int(customers.months[0].min())
+        span = last_month - origin + 1
+        n_products = len(products)
+        revenue = np.zeros(span * span)
+        orders = np.zeros(span * span, dtype=np.int64)
+        cube_revenue = np.zeros(n_products * span * span)
+        cube_orders = np.zeros(n_products * span * span, dtype=np.int64)
+        for chunk in iter_spilled(spill_dir, chunksize):
+            key, value = chunk["key"], chunk["value"]
+            month = chunk["month"].astype(np.int64)
+            product = chunk["product"].astype(np.int64)
+
+            first = customers.lookup(0, key)
+            cell = (first - origin) * span + (month - first)
+            revenue += np.bincount(cell, weights=value, minlength=span * span)
+            orders += np.bincount(cell, minlength=span * span)
+
+            first = pairs.lookup(product, key)
+            cell = (product * span + first - origin) * span + (month - first)
+            cube_revenue += np.bincount(cell, weights=value, minlength=n_products * span * span)
+            cube_orders += np.bincount(cell, minlength=n_products * span * span)
+
+    sizes = np.bincount(customers.months[0] - origin, minlength=span)
+    cube_sizes = np.zeros((n_products, span), dtype=np.int64)
+    for g, months in pairs.months.items():
+        cube_sizes[g] = np.bincount(months - origin, minlength=span)
+    names = sorted(products)
+    order = [products[name] for name in names]
+    overall = CohortEngine(origin, revenue.reshape(span, span), orders.reshape(span, span), sizes)
+    cube = ProductCohortCube(
+        names,
+        origin,
+        cube_revenue.reshape(n_products, span, span)[order],
+        cube_orders.reshape(n_products, span, span)[order],
+        cube_sizes[order],
+    )
+    return overall, cube
+
+
+def stream_index(path, max_horizon=24, chunksize=1_000_000):
+    return ProductIndex(*stream_cohorts(path, chunksize), max_horizon=max_horizon)
@@ -0,0 +1,85 @@
+import functools
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+import pandas as pd
+
+_active = ContextVar("ltv_timer", default=None)
+
+
+class StageTimer:
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.records = []
+        self._peaks = []
+
+    @contextmanager
+    def stage(self, name):
+        record = {"stage": name, "depth": len(self._peaks), "seconds": None}
+        self.records.append(record)
+        owns_trace = self.memory and not tracemalloc.is_tracing()
+        if owns_trace:
+            tracemalloc.start()
+        if self.memory:
+            base, peak = tracemalloc.get_traced_memory()
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            tracemalloc.reset_peak()
+        self._peaks.append(0)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            # A nested stage resets the tracemalloc peak, so the parent keeps the
+            # highest peak seen before and inside its children.
+            child_peak = self._peaks.pop()
+            if self.memory:
+                peak = max(tracemalloc.get_traced_memory()[1], child_peak)
+                record["peak_mb"] = max(peak - base, 0) / 2**20
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+            if owns_trace:
+                tracemalloc.stop()
+
+    def frame(self):
+        return pd.DataFrame(self.records, columns=["stage", "depth", "seconds"] + (["peak_mb"] if self.memory else []))
+
+    def summary(self):
+        out = {}
+        for r in self.records:
+            entry = out.setdefault(r["stage"], {"seconds": 0.0, "calls": 0})
+            entry["seconds"] += r["seconds"] or 0.0
+            entry["calls"] += 1
+            if "peak_mb" in r:
+                entry["peak_mb"] = max(entry.get("peak_mb", 0.0), r["peak_mb"])
+        return out
+
+
+@contextmanager
+def profiling(timer):
+    token = _active.set(timer)
+    try:
+        yield timer
+    finally:
+        _active.reset(token)
+
+
+def timed(name):
+    timer = _active.get()
+    return nullcontext() if timer is None else timer.stage(name)
+
+
+def traced(name):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            timer = _active.get()
+            if timer is None:
+                return fn(*args, **kwargs)
+            with timer.stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -3,6 +3,13 @@ import pandas as pd
 import numpy as np
 import altair as alt
 import inspect
+import os
+
+from ltv import compute_q1, compute_q2, product_recap_fixed, weighted_arpu
+from ltv.index import ALL, select_cum_arpu
+from ltv.pipeline import load_or_compute
+from ltv.projection import ltv_summary
+from ltv.timing import StageTimer, profiling, timed
 
 st.set_page_config(page_title="Birchbox LTV - Analyse complète", layout="wide")
 
@@ -41,45 +48,45 @@ def altair_cohort_lines(df, y_col, title):
     ).interactive()
     st.altair_chart(c)
 
-def complete_and_cumsum(monthly_series, max_horizon=24):
-    s = monthly_series.copy()
-    if len(s.index) == 0:
-        s = pd.Series(dtype=float)
-    s.index = s.index.astype(int)
-    s = s.reindex(range(0, max_horizon + 1), fill_value=0.0)
-    return s.cumsum()
+def altair_projection_band(df, title):
+    st.subheader(title)
+    base = alt.Chart(df).encode(x=alt.X("months_since:Q", title="Mois depuis acquisition"))
+    line = base.mark_line().encode(
+        y=alt.Y("projected_cum_arpu:Q", title="ARPU cumulé (€)"),
+        tooltip=[
+            alt.Tooltip("months_since:Q", title="Mois"),
+            alt.Tooltip("projected_cum_arpu:Q", title="Projection", format=",.2f"),
+        ],
+    )
+    layers = [line]
+    if "lower" in df:
+        layers.insert(0, base.mark_area(opacity=0.25).encode(y="lower:Q", y2="upper:Q"))
+    st.altair_chart(alt.layer(*layers).interactive())
+
+# Clé sur la version du fichier (mtime) : on garde la dernière et la précédente, les autres sont évincées.
+@st.cache_data(show_spinner="Calcul des tables LTV…", max_entries=2)
+def load_tables(path, mtime_ns, streaming, workers, resamples):
+    return load_or_compute(path, write=False, streaming=streaming, workers=workers, resamples=resamples)
 
 st.title("Birchbox LTV Analysis – Questions 1 à 6")
 
 csv_path = "Alexandre Marie de ficquelmont- Albert School - B2 S1 - Data set_ LTV modelling for Birchbox - Albert School - B2 S1 - Data set_ LTV modelling for Birchbox - Feuille 1.csv"
-df = pd.read_csv(csv_path, sep=None, engine="python")
-df.columns = df.columns.str.strip()
-df = df.rename(columns={"Customer ID": "customer_id", "Order date": "order_date", "Order value": "order_value", "Product contained in the order": "product"})
-df = df.replace(r"^\s*$", np.nan, regex=True)
-df["order_date"] = pd.to_datetime(df["order_date"], errors="coerce")
-df["order_value"] = (
-    df["order_value"]
-    .astype(str)
-    .str.replace("\u202f", "", regex=False)
-    .str.replace(" ", "", regex=False)
-    .str.replace(",", ".", regex=False)
-)
-df["order_value"] = pd.to_numeric(df["order_value"], errors="coerce")
-df["product"] = df["product"].astype("string").str.strip().replace({"": None}).fillna("(Inconnu)")
-df = df.dropna(subset=["customer_id", "order_date", "order_value"])
-df["order_month"] = df["order_date"].values.astype("datetime64[M]")
+streaming = st.sidebar.toggle("Mode streaming (mémoire bornée)", value=False)
+workers = st.sidebar.number_input("Processus de calcul", min_value=1, max_value=os.cpu_count() or 1, value=1)
+# Le bootstrap coûte ~0,01 s par tirage et par million de commandes (1 000 tirages sur 1 M de lignes : ~10 s) : désactivé par défaut.
+resamples = st.sidebar.number_input("Tirages bootstrap (0 : sans intervalle)", min_value=0, max_value=2000, value=0, step=100)
+profile = st.sidebar.toggle("Profilage des étapes", value=False)
+timer = StageTimer() if profile else None
+# En profilage on contourne st.cache_data pour mesurer la lecture ou le calcul réels.
+with profiling(timer), timed("load_tables"):
+    if profile:
+        tables = load_or_compute(csv_path, write=False, streaming=streaming, workers=workers, resamples=resamples)
+    else:
+        tables = load_tables(csv_path, os.stat(csv_path).st_mtime_ns, streaming, workers, resamples)
 
 st.header("Q1. Revenu total par cohorte mensuelle et taille de cohorte")
 
-def compute_q1(dfx):
-    first_order = dfx.groupby("customer_id")["order_month"].min().rename("cohort_month")
-    d = dfx.merge(first_order, on="customer_id", how="left")
-    d["months_since"] = (d["order_month"].dt.year - d["cohort_month"].dt.year) * 12 + (d["order_month"].dt.month - d["cohort_month"].dt.month)
-    cohort_revenue = d.groupby(["cohort_month", "months_since"], as_index=False)["order_value"].sum()
-    cohort_size = d.groupby("cohort_month")["customer_id"].nunique().rename("cohort_size").to_frame()
-    return cohort_revenue, cohort_size
-
-cohort_revenue, cohort_size = compute_q1(df)
+cohort_revenue, cohort_size = tables["q1_cohort_revenue"], tables["q1_cohort_size"]
 pivot_q1 = cohort_revenue.pivot(index="cohort_month", columns="months_since", values="order_value")
 tab = show_code(compute_q1, title="compute_q1")
 with tab:
@@ -88,18 +95,7 @@ with tab:
 
 st.header("Q2. ARPU cumulé par cohorte")
 
-def compute_q2(dfx):
-    first_order = dfx.groupby("customer_id")["order_month"].min().rename("cohort_month")
-    d = dfx.merge(first_order, on="customer_id", how="left")
-    d["months_since"] = (d["order_month"].dt.year - d["cohort_month"].dt.year) * 12 + (d["order_month"].dt.month - d["cohort_month"].dt.month)
-    cohort_size = d.groupby("cohort_month")["customer_id"].nunique().rename("cohort_size").to_frame()
-    cohort_monthly = d.groupby(["cohort_month", "months_since"], as_index=False)["order_value"].sum()
-    cohort_monthly = cohort_monthly.merge(cohort_size.reset_index(), on="cohort_month", how="left")
-    cohort_monthly["cum_revenue"] = cohort_monthly.sort_values("months_since").groupby("cohort_month")["order_value"].cumsum()
-    cohort_monthly["cum_arpu"] = cohort_monthly["cum_revenue"] / cohort_monthly["cohort_size"]
-    return cohort_monthly
-
-cohort_monthly = compute_q2(df)
+cohort_monthly = tables["q2_cohort_monthly"]
 pivot_q2 = cohort_monthly.pivot(index="cohort_month", columns="months_since", values="cum_arpu")
 tab = show_code(compute_q2, title="compute_q2")
 with tab:
@@ -107,21 +103,15 @@ with tab:
 
 st.header("Q3. Moyenne pondérée de l’ARPU cumulé et modélisation LTV")
 
-def weighted_arpu(cohort_monthly_df):
-    recs = []
-    for t in sorted(cohort_monthly_df["months_since"].unique()):
-        sub = cohort_monthly_df[cohort_monthly_df["months_since"] == t]
-        w = (sub["cum_arpu"] * sub["cohort_size"]).sum()
-        denom = sub["cohort_size"].sum()
-        if denom > 0:
-            recs.append({"months_since": t, "weighted_cum_arpu": w / denom})
-    return pd.DataFrame(recs)
-
-weighted_df = weighted_arpu(cohort_monthly)
+weighted_df = tables["q3_weighted_arpu"]
+projection = tables["q3_projection"]
 tab = show_code(weighted_arpu, title="weighted_arpu")
 with tab:
     show_table(weighted_df)
     line_chart(weighted_df, "weighted_cum_arpu", "ARPU cumulé pondéré (global)")
+    ltv_projection = tables["ltv_projection"]
+    altair_projection_band(ltv_projection[ltv_projection["product"] == ALL], "Projection LTV (min isotone / polynomiale)" + (" et intervalle bootstrap" if "lower" in ltv_projection else ""))
+    show_table(projection[projection["months_since"].isin([48, 60])].set_index("months_since"))
 
 st.header("Q4. Interprétation de l’évolution de l’ARPU et comportement client")
 st.markdown(
@@ -134,18 +124,11 @@ st.markdown(
 )
 
 st.header("Q5. Filtre ARPU cumulé par produit")
-produits = ["(Tous)"] + sorted(df["product"].dropna().unique().tolist())
-selected_product = st.selectbox("Sélectionne un produit :", produits)
-df_filtered = df if selected_product == "(Tous)" else df[df["product"] == selected_product]
-cohort_monthly_f = compute_q2(df_filtered)
-
-fix = []
-for cmo, g in cohort_monthly_f.groupby("cohort_month"):
-    s = g.set_index("months_since")["cum_arpu"]
-    inc = s - s.diff().fillna(s)
-    s2 = complete_and_cumsum(inc, max_horizon=24)
-    fix.append(pd.DataFrame({"cohort_month": cmo, "months_since": s2.index, "cum_arpu": s2.values}))
-cohort_monthly_f_fixed = pd.concat(fix, ignore_index=True)
+produits = tables["q5_cum_arpu"]["product"].unique().tolist()
+selected_products = st.multiselect("Sélectionne un ou plusieurs produits :", produits, default=[ALL])
+selected_product = ", ".join(selected_products) or ALL
+with profiling(timer), timed("select_cum_arpu"):
+    cohort_monthly_f_fixed = select_cum_arpu(tables["q5_cum_arpu"], selected_products)
 
 pivot_q5 = cohort_monthly_f_fixed.pivot(index="cohort_month", columns="months_since", values="cum_arpu")
 tab = show_code("Q5_view", title=f"Q5_view_{selected_product.replace(' ','_')}")
@@ -155,39 +138,15 @@ with tab:
 
 st.header("Q6. Récap LTV(1m) / LTV(24m) par produit")
 
-def product_recap_fixed(dfx, horizon_1=1, horizon_24=24):
-    d = dfx.copy()
-    d["order_month"] = d["order_date"].values.astype("datetime64[M]")
-    first = d.groupby(["product", "customer_id"])["order_month"].min().rename("cohort_month").reset_index()
-    d = d.merge(first, on=["product", "customer_id"], how="left")
-    d["months_since"] = (d["order_month"].dt.year - d["cohort_month"].dt.year) * 12 + (d["order_month"].dt.month - d["cohort_month"].dt.month)
-    rev = d.groupby(["product", "cohort_month", "months_since"], as_index=False)["order_value"].sum().rename(columns={"order_value": "rev"})
-    sizes = d.groupby(["product", "cohort_month"])["customer_id"].nunique().rename("cohort_size").reset_index()
-    recs = []
-    max_h = max(horizon_1, horizon_24)
-    for (prod, cmo), g in rev.groupby(["product", "cohort_month"]):
-        s = g.set_index("months_since")["rev"]
-        cum_rev = complete_and_cumsum(s, max_horizon=max_h)
-        n = sizes[(sizes["product"] == prod) & (sizes["cohort_month"] == cmo)]["cohort_size"].iloc[0]
-        arpu = cum_rev / float(n) if n > 0 else cum_rev * np.nan
-        tmp = pd.DataFrame({"product": prod, "cohort_month": cmo, "months_since": arpu.index, "cum_arpu": arpu.values, "cohort_size": n})
-        recs.append(tmp)
-    full = pd.concat(recs, ignore_index=True)
-    rows = []
-    for prod, g in full.groupby("product"):
-        for t, gt in g.groupby("months_since"):
-            w = (gt["cum_arpu"] * gt["cohort_size"]).sum()
-            denom = gt["cohort_size"].sum()
-            if denom > 0:
-                rows.append({"product": prod, "months_since": t, "weighted_cum_arpu": w / denom})
-    prod_w = pd.DataFrame(rows)
-    ltv1 = prod_w[prod_w["months_since"] == horizon_1][["product", "weighted_cum_arpu"]].rename(columns={"weighted_cum_arpu": "LTV_1m"})
-    ltv24 = prod_w[prod_w["months_since"] == horizon_24][["product", "weighted_cum_arpu"]].rename(columns={"weighted_cum_arpu": "LTV_24m"})
-    recap = ltv1.merge(ltv24, on="product", how="outer")
-    recap["LTV_24m/1m_ratio"] = recap["LTV_24m"] / recap["LTV_1m"]
-    return recap.sort_values("LTV_24m/1m_ratio", ascending=False)
-
-recap_df = product_recap_fixed(df, horizon_1=1, horizon_24=24)
+recap_df = tables["q6_product_recap"]
 tab = show_code(product_recap_fixed, title="product_recap_fixed")
 with tab:
     show_table(recap_df)
+    st.subheader("Projection LTV 48 / 60 mois par produit")
+    show_table(ltv_summary(tables["ltv_projection"]))
+
+if timer is not None:
+    st.sidebar.subheader("Temps par étape")
+    timings = timer.frame()
+    timings["stage"] = ["  " * d + s for d, s in zip(timings["depth"], timings["stage"])]
+    st.sidebar.dataframe(timings[["stage", "seconds"]].round(4), hide_index=True)
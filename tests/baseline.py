@@ -0,0 +1,78 @@
+# Implémentations pandas d'origine (main.py avant le paquet ltv), gardées
+# telles quelles comme référence pour les tests d'équivalence.
+import numpy as np
+import pandas as pd
+
+
+def compute_q1(dfx):
+    first_order = dfx.groupby("customer_id")["order_month"].min().rename("cohort_month")
+    d = dfx.merge(first_order, on="customer_id", how="left")
+    d["months_since"] = (d["order_month"].dt.year - d["cohort_month"].dt.year) * 12 + (d["order_month"].dt.month - d["cohort_month"].dt.month)
+    cohort_revenue = d.groupby(["cohort_month", "months_since"], as_index=False)["order_value"].sum()
+    cohort_size = d.groupby("cohort_month")["customer_id"].nunique().rename("cohort_size").to_frame()
+    return cohort_revenue, cohort_size
+
+
+def compute_q2(dfx):
+    first_order = dfx.groupby("customer_id")["order_month"].min().rename("cohort_month")
+    d = dfx.merge(first_order, on="customer_id", how="left")
+    d["months_since"] = (d["order_month"].dt.year - d["cohort_month"].dt.year) * 12 + (d["order_month"].dt.month - d["cohort_month"].dt.month)
+    cohort_size = d.groupby("cohort_month")["customer_id"].nunique().rename("cohort_size").to_frame()
+    cohort_monthly = d.groupby(["cohort_month", "months_since"], as_index=False)["order_value"].sum()
+    cohort_monthly = cohort_monthly.merge(cohort_size.reset_index(), on="cohort_month", how="left")
+    cohort_monthly["cum_revenue"] = cohort_monthly.sort_values("months_since").groupby("cohort_month")["order_value"].cumsum()
+    cohort_monthly["cum_arpu"] = cohort_monthly["cum_revenue"] / cohort_monthly["cohort_size"]
+    return cohort_monthly
+
+
+def weighted_arpu(cohort_monthly_df):
+    recs = []
+    for t in sorted(cohort_monthly_df["months_since"].unique()):
+        sub = cohort_monthly_df[cohort_monthly_df["months_since"] == t]
+        w = (sub["cum_arpu"] * sub["cohort_size"]).sum()
+        denom = sub["cohort_size"].sum()
+        if denom > 0:
+            recs.append({"months_since": t, "weighted_cum_arpu": w / denom})
+    return pd.DataFrame(recs)
+
+
+def complete_and_cumsum(monthly_series, max_horizon=24):
+    s = monthly_series.copy()
+    if len(s.index) == 0:
+        s = pd.Series(dtype=float)
+    s.index = s.index.astype(int)
+    s = s.reindex(range(0, max_horizon + 1), fill_value=0.0)
+    return s.cumsum()
+
+
+def product_recap_fixed(dfx, horizon_1=1, horizon_24=24):
+    d = dfx.copy()
+    d["order_month"] = d["order_date"].values.astype("datetime64[M]")
+    first = d.groupby(["product", "customer_id"])["order_month"].min().rename("cohort_month").reset_index()
+    d = d.merge(first, on=["product", "customer_id"], how="left")
+    d["months_since"] = (d["order_month"].dt.year - d["cohort_month"].dt.year) * 12 + (d["order_month"].dt.month - d["cohort_month"].dt.month)
+    rev = d.groupby(["product", "cohort_month", "months_since"], as_index=False)["order_value"].sum().rename(columns={"order_value": "rev"})
+    sizes = d.groupby(["product", "cohort_month"])["customer_id"].nunique().rename("cohort_size").reset_index()
+    recs = []
+    max_h = max(horizon_1, horizon_24)
+    for (prod, cmo), g in rev.groupby(["product", "cohort_month"]):
+        s = g.set_index("months_since")["rev"]
+        cum_rev = complete_and_cumsum(s, max_horizon=max_h)
+        n = sizes[(sizes["product"] == prod) & (sizes["cohort_month"] == cmo)]["cohort_size"].iloc[0]
+        arpu = cum_rev / float(n) if n > 0 else cum_rev * np.nan
+        tmp = pd.DataFrame({"product": prod, "cohort_month": cmo, "months_since": arpu.index, "cum_arpu": arpu.values, "cohort_size": n})
+        recs.append(tmp)
+    full = pd.concat(recs, ignore_index=True)
+    rows = []
+    for prod, g in full.groupby("product"):
+        for t, gt in g.groupby("months_since"):
+            w = (gt["cum_arpu"] * gt["cohort_size"]).sum()
+            denom = gt["cohort_size"].sum()
+            if denom > 0:
+                rows.append({"product": prod, "months_since": t, "weighted_cum_arpu": w / denom})
+    prod_w = pd.DataFrame(rows)
+    ltv1 = prod_w[prod_w["months_since"] == horizon_1][["product", "weighted_cum_arpu"]].rename(columns={"weighted_cum_arpu": "LTV_1m"})
+    ltv24 = prod_w[prod_w["months_since"] == horizon_24][["product", "weighted_cum_arpu"]].rename(columns={"weighted_cum_arpu": "LTV_24m"})
+    recap = ltv1.merge(ltv24, on="product", how="outer")
+    recap["LTV_24m/1m_ratio"] = recap["LTV_24m"] / recap["LTV_1m"]
+    return recap.sort_values("LTV_24m/1m_ratio", ascending=False)
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ltv.ingest import load_orders  # noqa: E402
+
+CSV = next(os.path.join(ROOT, f) for f in sorted(os.listdir(ROOT)) if f.endswith(".csv"))
+
+
+@pytest.fixture(scope="session")
+def csv_path():
+    return CSV
+
+
+@pytest.fixture(scope="session")
+def frame():
+    # Nettoyage tel qu'il était fait dans main.py avant le paquet ltv.
+    df = pd.read_csv(CSV, sep=None, engine="python")
+    df.columns = df.columns.str.strip()
+    df = df.rename(columns={
+        "Customer ID": "customer_id",
+        "Order date": "order_date",
+        "Order value": "order_value",
+        "Product contained in the order": "product",
+    })
+    df = df.replace(r"^\s*$", np.nan, regex=True)
+    df["order_date"] = pd.to_datetime(df["order_date"], errors="coerce")
+    df["order_value"] = (
+        df["order_value"]
+        .astype(str)
+        .str.replace("\u202f", "", regex=False)
+        .str.replace(" ", "", regex=False)
+        .str.replace(",", ".", regex=False)
+    )
+    df["order_value"] = pd.to_numeric(df["order_value"], errors="coerce")
+    df["product"] = df["product"].astype("string").str.strip().replace({"": None}).fillna("(Inconnu)")
+    df = df.dropna(subset=["customer_id", "order_date", "order_value"])
+    df["order_month"] = df["order_date"].values.astype("datetime64[M]")
+    return df
+
+
+@pytest.fixture(scope="session")
+def orders(tmp_path_factory):
+    return load_orders(CSV, cache_root=str(tmp_path_factory.mktemp("cache")))
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import baseline
+from ltv.cohorts import compute_q1, compute_q2, weighted_arpu
+
+
+def assert_same(result, expected):
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, rtol=1e-12)
+
+
+@pytest.fixture(params=["frame", "orders"])
+def data(request, frame, orders):
+    return frame if request.param == "frame" else orders
+
+
+def test_q1_matches_baseline(data, frame):
+    revenue, size = compute_q1(data)
+    expected_revenue, expected_size = baseline.compute_q1(frame)
+    assert_same(revenue, expected_revenue)
+    assert_same(size, expected_size)
+
+
+def test_q2_matches_baseline(data, frame):
+    assert_same(compute_q2(data), baseline.compute_q2(frame))
+
+
+def test_weighted_arpu_matches_baseline(data, frame):
+    expected = baseline.weighted_arpu(baseline.compute_q2(frame))
+    assert_same(weighted_arpu(data), expected)
+    assert_same(weighted_arpu(compute_q2(data)), expected)
+
+
+def test_integer_customer_ids(frame):
+    # Des identifiants entiers très grands ou négatifs ne doivent pas servir d'indices.
+    ids = frame["customer_id"].astype("category").cat.codes.to_numpy(dtype=np.int64)
+    dfx = frame.assign(customer_id=ids * 10**12 - 10**15)
+    revenue, size = compute_q1(dfx)
+    expected_revenue, expected_size = baseline.compute_q1(frame)
+    assert_same(revenue, expected_revenue)
+    assert_same(size, expected_size)
@@ -0,0 +1,82 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ltv.incremental import CohortState, check_consistency
+from ltv.pipeline import append_orders
+
+
+@pytest.fixture
+def orders_frame(frame):
+    return frame[["customer_id", "order_date", "order_value"]]
+
+
+def run_files(path):
+    with open(os.path.join(path, "state.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    return {
+        name: os.stat(os.path.join(path, name, "customer.npy" if name.startswith("history-") else "ids.npy")).st_mtime_ns
+        for name in meta["customers"] + meta["history"]
+    }
+
+
+def test_state_matches_full(orders_frame, tmp_path):
+    # Ordre aléatoire : beaucoup de commandes arrivent avant la première commande du client.
+    shuffled = orders_frame.sample(frac=1, random_state=1).reset_index(drop=True)
+    state = CohortState()
+    for chunk in np.array_split(np.arange(len(shuffled)), 5):
+        state.append_frame(shuffled.iloc[chunk])
+        assert check_consistency(state, shuffled.iloc[:chunk[-1] + 1])
+    path = tmp_path / "state"
+    state.save(path)
+    loaded = CohortState.load(path)
+    assert check_consistency(loaded, orders_frame)
+    extra = pd.DataFrame({
+        "customer_id": ["nouveau", orders_frame["customer_id"].iloc[0]],
+        "order_date": pd.to_datetime(["2020-06-01", "2015-01-03"]),
+        "order_value": [10.0, 20.0],
+    })
+    loaded.append_frame(extra)
+    full = pd.concat([orders_frame, extra], ignore_index=True)
+    assert check_consistency(loaded, full)
+    loaded.save(path)
+    assert check_consistency(CohortState.load(path), full)
+
+
+def test_from_orders(orders):
+    assert check_consistency(CohortState.from_orders(orders), orders)
+
+
+def test_append_only_writes_new_runs(orders_frame, tmp_path):
+    path = tmp_path / "state"
+    state = CohortState()
+    state.append_frame(orders_frame.iloc[:-20])
+    state.save(path)
+    before = run_files(path)
+    for i in range(-20, 0, 5):
+        state = CohortState.load(path)
+        state.append_frame(orders_frame.iloc[i:i + 5 or None])
+        state.save(path)
+    after = run_files(path)
+    # Les gros runs du premier chargement ne sont ni relus en entier ni réécrits.
+    largest = [name for name in before if name in after]
+    assert largest and all(before[name] == after[name] for name in largest)
+    assert check_consistency(CohortState.load(path), orders_frame)
+    leftovers = {n for n in os.listdir(path) if n.startswith(("customers-", "history-"))} - set(after)
+    assert not leftovers
+
+
+def test_append_orders_from_csv(csv_path, frame, tmp_path):
+    with open(csv_path, encoding="utf-8-sig") as f:
+        header, *lines = f.readlines()
+    half = len(lines) // 2
+    state_path = str(tmp_path / "state")
+    for i, part in enumerate((lines[half:], lines[:half])):
+        batch = tmp_path / f"batch{i}.csv"
+        batch.write_text(header + "".join(part), encoding="utf-8")
+        state = append_orders(state_path, str(batch))
+    assert check_consistency(state, frame)
+    assert check_consistency(CohortState.load(state_path), frame)
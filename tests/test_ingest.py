@@ -0,0 +1,70 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from ltv.ingest import cache_dir_for, load_orders, read_meta
+from ltv.timing import StageTimer, profiling
+
+
+@pytest.fixture
+def source(tmp_path, csv_path):
+    path = tmp_path / "orders.csv"
+    shutil.copy(csv_path, path)
+    return str(path)
+
+
+def load(path, root):
+    timer = StageTimer()
+    with profiling(timer):
+        orders = load_orders(path, cache_root=root)
+    return orders, {stage: entry["calls"] for stage, entry in timer.summary().items()}
+
+
+def test_second_load_reads_cache(source, tmp_path):
+    root = str(tmp_path / "cache")
+    first, stages = load(source, root)
+    assert stages.get("cache_build") == 1
+    second, stages = load(source, root)
+    assert "cache_build" not in stages and "file_hash" not in stages and stages.get("cache_load") == 1
+    assert isinstance(second.order_value, np.memmap)
+    for name in ("customer_id", "product", "order_month", "order_value"):
+        assert np.array_equal(getattr(first, name), getattr(second, name))
+    assert second.version == first.version
+
+
+def test_touch_keeps_cache_and_updates_meta(source, tmp_path):
+    root = str(tmp_path / "cache")
+    load(source, root)
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    _, stages = load(source, root)
+    assert "cache_build" not in stages and stages.get("file_hash") == 1
+    assert read_meta(cache_dir_for(source, root))["mtime_ns"] == os.stat(source).st_mtime_ns
+    _, stages = load(source, root)
+    assert "file_hash" not in stages
+
+
+def test_changed_content_rebuilds(source, tmp_path):
+    root = str(tmp_path / "cache")
+    before, _ = load(source, root)
+    rows, version = len(before), before.version
+    with open(source, encoding="utf-8") as f:
+        lines = f.readlines()
+    with open(source, "w", encoding="utf-8") as f:
+        f.writelines(lines[:101])
+    after, stages = load(source, root)
+    assert stages.get("cache_build") == 1
+    assert len(after) < rows and after.version != version
+
+
+def test_corrupt_array_rebuilds(source, tmp_path):
+    root = str(tmp_path / "cache")
+    # Copie avant d'abîmer le fichier : le tableau chargé est un memmap.
+    expected = np.array(load(source, root)[0].order_value)
+    with open(os.path.join(cache_dir_for(source, root), "order_value.npy"), "wb") as f:
+        f.write(b"pas un tableau")
+    after, stages = load(source, root)
+    assert stages.get("cache_build") == 1
+    assert np.array_equal(after.order_value, expected)
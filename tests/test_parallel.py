@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from ltv.cohorts import CohortEngine, ProductCohortCube, product_recap_fixed
+from ltv.index import product_index
+from ltv.parallel import balance, parallel_cube, parallel_index, shard_rows
+
+
+def assert_same_arrays(a, b):
+    assert a.first_month == b.first_month
+    for name in ("revenue", "orders", "sizes"):
+        x, y = getattr(a, name), getattr(b, name)
+        assert x.shape == y.shape and np.array_equal(x, y), name
+
+
+def test_balance_spreads_weights():
+    weights = np.array([50, 10, 40, 30, 20, 5])
+    shard = balance(weights, 3)
+    assert sorted(np.bincount(shard, weights=weights, minlength=3)) == [50, 50, 55]
+
+
+def test_shard_rows_keeps_row_order():
+    shard_of_row = np.array([2, 0, 1, 0, 2, 2, 1])
+    order, bounds = shard_rows(shard_of_row, 3)
+    assert bounds.tolist() == [0, 2, 4, 7]
+    assert order.tolist() == [1, 3, 2, 6, 0, 4, 5]
+
+
+@pytest.mark.parametrize("workers", [2, 3])
+def test_parallel_matches_serial(orders, workers):
+    # Même ordre de sommation que le chemin série : égalité au bit près.
+    serial = ProductCohortCube.from_orders(orders)
+    assert_same_arrays(parallel_cube(orders, workers), serial)
+    index = parallel_index(orders, 24, workers)
+    assert_same_arrays(index.overall, CohortEngine.from_orders(orders))
+    assert_same_arrays(index.cube, serial)
+    assert product_recap_fixed(index.cube).equals(product_recap_fixed(serial))
+
+
+def test_product_index_workers(orders):
+    assert product_index(orders, workers=2).table().equals(product_index(orders).table())
@@ -0,0 +1,96 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from ltv.cli import main
+from ltv.pipeline import (
+    INDEXED, TABLES, compute_tables, is_fresh, load_or_compute, output_dir_for, read_manifest, read_tables, run, write_tables,
+)
+
+
+@pytest.fixture
+def source(tmp_path, csv_path):
+    return shutil.copy(csv_path, tmp_path / "orders.csv")
+
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory, csv_path):
+    return compute_tables(shutil.copy(csv_path, tmp_path_factory.mktemp("src") / "orders.csv"), resamples=20)
+
+
+def assert_same_tables(result, expected):
+    assert sorted(result) == sorted(expected)
+    for name, table in expected.items():
+        # Les tables sont écrites sans leur index, sauf celles d'INDEXED.
+        expected_table = table if name in INDEXED else table.reset_index(drop=True)
+        pd.testing.assert_frame_equal(result[name], expected_table, check_dtype=False, rtol=1e-12, obj=name)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_tables_round_trip(tables, tmp_path, fmt):
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+    manifest = write_tables(tables, tmp_path / "out", fmt=fmt)
+    assert manifest["format"] == fmt and sorted(manifest["tables"]) == sorted(TABLES)
+    assert_same_tables(read_tables(tmp_path / "out"), tables)
+
+
+def test_freshness(source, tmp_path):
+    out_root = str(tmp_path / "out")
+    run(source, out_root=out_root, resamples=20)
+    manifest = read_manifest(output_dir_for(source, out_root))
+    assert is_fresh(manifest, source, resamples=20)
+    # Processus et taille des blocs ne changent pas le résultat.
+    assert is_fresh(manifest, source, resamples=20, workers=4, chunksize=1000)
+    # Des tables avec intervalles bootstrap répondent aussi à une demande sans.
+    assert is_fresh(manifest, source, resamples=0)
+    assert is_fresh(manifest, source, resamples=0, streaming=True)
+    assert not is_fresh(manifest, source, resamples=50)
+    assert not is_fresh(manifest, source, resamples=20, seed=1)
+    assert not is_fresh(manifest, source, resamples=20, horizons=(1, 24))
+    assert not is_fresh(manifest, source, resamples=20, projection_horizon=48)
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert not is_fresh(manifest, source, resamples=20)
+
+
+def test_streaming_output_has_no_bands(source, tmp_path):
+    out_root = str(tmp_path / "out")
+    run(source, out_root=out_root, streaming=True, chunksize=5000, resamples=20)
+    manifest = read_manifest(output_dir_for(source, out_root))
+    assert is_fresh(manifest, source, resamples=0)
+    assert not is_fresh(manifest, source, resamples=20)
+
+
+def test_dashboard_reads_batch_output(source, tmp_path):
+    out_root = str(tmp_path / "out")
+    assert main([str(source), "-o", out_root, "--resamples", "20", "--workers", "2"]) == 0
+    out_dir = output_dir_for(source, out_root)
+    manifest = read_manifest(out_dir)
+    tables = load_or_compute(source, out_root=out_root, write=False, resamples=0, workers=1)
+    assert "lower" in tables["ltv_projection"]
+    assert read_manifest(out_dir) == manifest
+
+
+def test_dashboard_does_not_write(source, tmp_path):
+    out_root = str(tmp_path / "out")
+    tables = load_or_compute(source, out_root=out_root, write=False, resamples=0)
+    assert sorted(tables) == sorted(TABLES)
+    assert not os.path.exists(out_root)
+
+
+def test_inputs_with_same_name(csv_path, tmp_path, capsys):
+    paths = []
+    for folder in ("a", "b"):
+        (tmp_path / folder).mkdir()
+        paths.append(str(shutil.copy(csv_path, tmp_path / folder / "orders.csv")))
+    out_root = str(tmp_path / "out")
+    assert main(paths + ["-o", out_root, "--resamples", "0"]) == 0
+    dirs = [output_dir_for(p, out_root) for p in paths]
+    assert dirs[0] != dirs[1]
+    out = capsys.readouterr().out
+    for path, out_dir in zip(paths, dirs):
+        assert f"-> {out_dir}" in out
+        assert read_manifest(out_dir)["source"] == os.path.abspath(path)
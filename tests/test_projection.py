@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from ltv.cohorts import weighted_arpu
+from ltv.index import ALL, ProductIndex
+from ltv.projection import (
+    CustomerBootstrap, bootstrap_projection, isotonic_batch, polynomial_batch, project_batch, project_ltv,
+    project_products, weighted_curve,
+)
+
+
+def pava(y):
+    # Pool adjacent violators, poids unitaires : référence directe de l'ajustement isotone.
+    blocks = []
+    for v in y:
+        blocks.append([v, 1])
+        while len(blocks) > 1 and blocks[-2][0] > blocks[-1][0]:
+            v2, n2 = blocks.pop()
+            v1, n1 = blocks.pop()
+            blocks.append([(v1 * n1 + v2 * n2) / (n1 + n2), n1 + n2])
+    return np.repeat([v for v, _ in blocks], [n for _, n in blocks])
+
+
+def polyfit_curve(y, months):
+    t = np.flatnonzero(~np.isnan(y))
+    return np.polyval(np.polyfit(t, y[t], min(2, len(t) - 1)), months)
+
+
+@pytest.fixture(scope="module")
+def curves():
+    # Courbes bruitées à trous, dont des lignes à un et deux points.
+    rng = np.random.default_rng(0)
+    y = np.cumsum(rng.normal(1.0, 2.0, (60, 30)), axis=1)
+    y[rng.random(y.shape) < 0.3] = np.nan
+    y[0, :] = np.nan
+    y[0, 5] = 2.0
+    y[1, :] = np.nan
+    y[1, [4, 20]] = [3.0, 1.0]
+    return y
+
+
+def test_isotonic_matches_pava(curves):
+    valid = ~np.isnan(curves)
+    fit = isotonic_batch(curves, valid.astype(np.float64))
+    for row, ok, out in zip(curves, valid, fit):
+        assert np.allclose(out[ok], pava(row[ok]), rtol=1e-12, atol=1e-12)
+        assert np.isnan(out[~ok]).all()
+
+
+def test_polynomial_matches_polyfit(curves):
+    months = np.arange(61)
+    fit = polynomial_batch(curves, (~np.isnan(curves)).astype(np.float64), months)
+    expected = np.array([polyfit_curve(row, months) for row in curves])
+    assert np.allclose(fit, expected, rtol=1e-9, atol=1e-9)
+
+
+def test_project_batch_interpolates_isotonic(curves):
+    months = np.arange(61)
+    isotonic, polynomial, projected = project_batch(curves, horizon=60)
+    for row, out in zip(curves, isotonic):
+        t = np.flatnonzero(~np.isnan(row))
+        assert np.allclose(out, np.interp(months, t, pava(row[t])), rtol=1e-12, atol=1e-12)
+    assert np.array_equal(projected, np.minimum(isotonic, polynomial))
+
+
+def test_project_ltv_matches_sklearn(orders):
+    isotonic_regression = pytest.importorskip("sklearn.isotonic")
+    weighted = weighted_arpu(orders)
+    months = np.arange(61)
+    t = weighted["months_since"].to_numpy()
+    y = weighted["weighted_cum_arpu"].to_numpy()
+    iso = isotonic_regression.IsotonicRegression(increasing=True, out_of_bounds="clip").fit(t, y)
+    projection = project_ltv(weighted, horizon=60)
+    assert np.allclose(projection["isotonic"], iso.predict(months), rtol=1e-12)
+    assert np.allclose(projection["polynomial"], np.polyval(np.polyfit(t, y, 2), months), rtol=1e-9)
+    assert np.allclose(projection["projected_cum_arpu"], np.minimum(iso.predict(months), projection["polynomial"]))
+
+
+def test_bootstrap_point_matches_products(orders):
+    boot = CustomerBootstrap.from_orders(orders)
+    index = ProductIndex.from_orders(orders)
+    point = boot.curves(np.ones(boot.n_customers))[0]
+    overall = weighted_curve(index.overall.revenue, index.overall.orders > 0, index.overall.sizes)
+    assert np.allclose(point[0, :len(overall)], overall, rtol=1e-12, equal_nan=True)
+
+    projection = bootstrap_projection(orders, n_resamples=200, horizon=60)
+    expected = project_products(index, horizon=60)
+    assert projection["product"].tolist() == expected["product"].tolist()
+    assert projection["product"].iloc[0] == ALL
+    assert np.allclose(projection["projected_cum_arpu"], expected["projected_cum_arpu"], rtol=1e-9)
+    assert (projection["lower"] <= projection["projected_cum_arpu"]).all()
+    assert (projection["projected_cum_arpu"] <= projection["upper"]).all()
+
+
+def test_resample_is_seeded(orders):
+    boot = CustomerBootstrap.from_orders(orders)
+    # Petit budget : plusieurs blocs de tirages.
+    budget = 3 * int(np.prod(boot.shape))
+    a = boot.resample(30, seed=3, budget=budget)
+    assert a.shape == (30, boot.shape[0], boot.shape[2])
+    assert np.array_equal(a, boot.resample(30, seed=3, budget=budget), equal_nan=True)
+    assert not np.array_equal(a, boot.resample(30, seed=4, budget=budget), equal_nan=True)
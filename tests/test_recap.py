@@ -0,0 +1,28 @@
+import pandas as pd
+import pytest
+
+import baseline
+from ltv.cohorts import ProductCohortCube, product_recap_fixed
+
+
+def assert_same(result, expected):
+    pd.testing.assert_frame_equal(
+        result.reset_index(drop=True), expected.reset_index(drop=True), check_dtype=False, rtol=1e-12
+    )
+
+
+@pytest.mark.parametrize("source", ["frame", "orders"])
+def test_recap_matches_baseline(source, frame, orders):
+    data = frame if source == "frame" else orders
+    assert_same(product_recap_fixed(data), baseline.product_recap_fixed(frame))
+
+
+@pytest.mark.parametrize("horizons", [(1, 24), (3, 12), (6, 36)])
+def test_recap_horizons_match_baseline(horizons, frame):
+    assert_same(product_recap_fixed(frame, *horizons), baseline.product_recap_fixed(frame, *horizons))
+
+
+def test_cube_ltv_matches_baseline(orders, frame):
+    ltv = ProductCohortCube.from_orders(orders).ltv((1, 24))
+    expected = baseline.product_recap_fixed(frame).sort_values("product")
+    assert_same(ltv, expected[["product", "LTV_1m", "LTV_24m"]])
@@ -0,0 +1,53 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from ltv.cohorts import CohortEngine, ProductCohortCube
+from ltv.index import ProductIndex
+from ltv.pipeline import compute_tables
+from ltv.streaming import FirstMonths, stream_cohorts
+
+
+def test_first_months_matches_groupby():
+    rng = np.random.default_rng(0)
+    group = rng.integers(0, 4, 20_000)
+    key = rng.integers(0, 3_000, 20_000).astype(np.uint64)
+    month = rng.integers(600, 650, 20_000)
+    state = FirstMonths(flush_rows=1_000)
+    for rows in np.array_split(np.arange(len(key)), 17):
+        state.add(group[rows], key[rows], month[rows])
+    state.flush()
+    expected = pd.DataFrame({"group": group, "key": key, "month": month}).groupby(["group", "key"])["month"].min()
+    assert len(state) == len(expected)
+    g = expected.index.get_level_values("group").to_numpy()
+    k = expected.index.get_level_values("key").to_numpy()
+    assert np.array_equal(state.lookup(g, k), expected.to_numpy())
+    assert np.array_equal(state.lookup(2, k[g == 2]), expected.to_numpy()[g == 2])
+
+
+def test_streaming_matches_in_memory(csv_path, orders):
+    # Le revenu est sommé par morceaux : même résultat à l'arrondi près.
+    engine, cube = stream_cohorts(csv_path, chunksize=5000)
+    expected = CohortEngine.from_orders(orders)
+    assert engine.first_month == expected.first_month
+    assert np.array_equal(engine.orders, expected.orders) and np.array_equal(engine.sizes, expected.sizes)
+    assert np.allclose(engine.revenue, expected.revenue, rtol=1e-12, atol=0)
+    # Le cube streamé garde l'horizon global ; les mois en plus sont vides.
+    expected = ProductCohortCube.from_orders(orders)
+    horizon = max(cube.revenue.shape[2], expected.revenue.shape[2]) - 1
+    assert cube.first_month == expected.first_month and np.array_equal(cube.sizes, expected.sizes)
+    assert np.allclose(cube.cum_revenue(horizon), expected.cum_revenue(horizon), rtol=1e-12, atol=0)
+    pd.testing.assert_frame_equal(
+        ProductIndex(engine, cube).table(), ProductIndex.from_orders(orders).table(), check_dtype=False, rtol=1e-12
+    )
+
+
+def test_streaming_tables_match(csv_path, tmp_path):
+    # Copie dans tmp_path : le cache .ltv_cache est créé à côté du fichier.
+    csv_path = shutil.copy(csv_path, tmp_path / "orders.csv")
+    streamed = compute_tables(csv_path, streaming=True, chunksize=5000, resamples=0)
+    expected = compute_tables(csv_path, resamples=0)
+    assert list(streamed) == list(expected)
+    for name, table in expected.items():
+        pd.testing.assert_frame_equal(streamed[name], table, check_dtype=False, rtol=1e-9, obj=name)